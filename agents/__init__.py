@@ -2,3 +2,4 @@ from .agent import Agent
 from .random_agent import RandomAgent
 from .human_agent import HumanAgent
 from .student_agent import StudentAgent
+from .remote_agent import RemoteAgent
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Agent:
     def __init__(self):
         """
@@ -6,10 +9,40 @@ class Agent:
         self.name = "DummyAgent"
         # Flag to indicate whether the agent can be used to autoplay
         self.autoplay = False
+        # Flag to indicate whether the agent modifies the chess board passed to step.
+        # If False, the agent gets a read-only view of the board instead of a copy.
+        self.mutable_board = True
+        # Random generator of the agent, seeded by the world through set_seed
+        self.rng = np.random.default_rng()
 
     def __str__(self) -> str:
         return self.name
 
+    def set_seed(self, seed):
+        """
+        Reset the random generator of the agent. Agents should draw all their
+        randomness from self.rng so that games can be replayed.
+
+        Parameters
+        ----------
+        seed : int or numpy.random.SeedSequence
+            The seed of the agent's random generator.
+        """
+        self.rng = np.random.default_rng(seed)
+
+    def get_metrics(self):
+        """
+        Metrics of the last step of the agent, collected by the world after every move
+        and written by the simulator with --stats_path. Override it to report e.g. the
+        number of simulations or nodes searched.
+
+        Returns
+        -------
+        metrics : dict
+            Metric names to numbers or strings.
+        """
+        return {}
+
     def step(self, chess_board, my_pos, adv_pos, max_step):
         """
         Main decision logic of the agent, which is called by the simulator.
@@ -18,7 +51,7 @@ class Agent:
         Parameters
         ----------
         chess_board : numpy.ndarray of shape (board_size, board_size, 4)
-            The chess board.
+            The chess board. It is read-only if the agent sets mutable_board = False.
         my_pos : tuple of int
             The position of the agent.
         adv_pos : tuple of int
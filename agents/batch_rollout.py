@@ -0,0 +1,211 @@
+import numpy as np
+from connectivity import label_regions
+from constants import MOVES, OPPOSITES
+
+MOVE_ROWS = np.array([m_r for m_r, _ in MOVES])
+MOVE_COLS = np.array([m_c for _, m_c in MOVES])
+OPPOSITE_DIRS = np.array([OPPOSITES[dir] for dir in range(4)])
+# Corners of the cell (r, c) at the ends of its wall in each direction, as offsets
+# of the (board_size + 1, board_size + 1) grid of wall corners
+END_ROWS = np.array([[0, 0], [0, 1], [1, 1], [0, 1]])
+END_COLS = np.array([[0, 1], [1, 1], [0, 1], [0, 0]])
+
+
+class BatchRollout:
+    """
+    Uniformly random playouts of many copies of a position at once.
+
+    The B games are held as a (B, board_size, board_size, 4) array of walls and
+    arrays of positions. Every move is played in all the unfinished games
+    together: a bounded BFS on masks gives the reachable cells, a random legal
+    (cell, direction) pair is drawn per game, and the regions of all the boards
+    are labelled with `label_regions` to detect the games that ended. A wall can
+    only split a region if both its ends already touch other walls, so the number
+    of walls at every wall corner is tracked and only those boards are labelled.
+
+    Parameters
+    ----------
+    batch_size : int
+        The number of playouts B run by `run`.
+    max_moves : int
+        The maximum number of moves of a playout, unfinished playouts are ties.
+    rng : numpy.random.Generator, optional
+        The random generator of the playouts.
+    """
+
+    def __init__(self, batch_size=64, max_moves=100, rng=None):
+        self.batch_size = batch_size
+        self.max_moves = max_moves
+        self.rng = np.random.default_rng() if rng is None else rng
+
+    def reachable(self, boards, my_pos, adv_pos, max_step):
+        """
+        Cells reachable from my_pos within max_step steps on each board.
+
+        Parameters
+        ----------
+        boards : numpy.ndarray of shape (B, board_size, board_size, 4)
+            The chess boards.
+        my_pos, adv_pos : numpy.ndarray of shape (B, 2)
+            The positions of the player to move and of its adversary.
+        max_step : int
+            The maximum number of steps.
+
+        Returns
+        -------
+        reach : numpy.ndarray of shape (B, board_size, board_size)
+            Mask of the reachable cells, including my_pos.
+        """
+        index = np.arange(boards.shape[0])
+        reach = np.zeros(boards.shape[:3], dtype=bool)
+        reach[index, my_pos[:, 0], my_pos[:, 1]] = True
+        blocked = np.zeros_like(reach)
+        blocked[index, adv_pos[:, 0], adv_pos[:, 1]] = True
+        frontier = reach
+        for _ in range(max_step):
+            step = np.zeros_like(reach)
+            step[:, :-1, :] |= (frontier & ~boards[..., 0])[:, 1:, :]
+            step[:, :, 1:] |= (frontier & ~boards[..., 1])[:, :, :-1]
+            step[:, 1:, :] |= (frontier & ~boards[..., 2])[:, :-1, :]
+            step[:, :, :-1] |= (frontier & ~boards[..., 3])[:, :, 1:]
+            frontier = step & ~reach & ~blocked
+            if not frontier.any():
+                break
+            reach |= frontier
+        return reach
+
+    def random_moves(self, boards, my_pos, adv_pos, max_step):
+        """
+        Draw a uniformly random legal move on each board.
+
+        Returns
+        -------
+        moves : numpy.ndarray of shape (B, 3)
+            The row, column and barrier direction of each move.
+        """
+        reach = self.reachable(boards, my_pos, adv_pos, max_step)
+        legal = reach[..., None] & ~boards
+        # the largest random key among the legal moves is a uniform draw
+        keys = self.rng.random(legal.shape)
+        keys[~legal] = -1.0
+        flat = keys.reshape(boards.shape[0], -1).argmax(axis=1)
+        return np.stack(np.unravel_index(flat, boards.shape[1:]), axis=1)
+
+    def corner_degrees(self, board):
+        """
+        Number of walls at each wall corner of a board.
+
+        Returns
+        -------
+        degrees : numpy.ndarray of shape (board_size + 1, board_size + 1)
+        """
+        board_size = board.shape[0]
+        degrees = np.zeros((board_size + 1, board_size + 1), dtype=np.int64)
+        # walls above each row of cells and below the last one
+        horizontal = np.concatenate([board[:, :, 0], board[-1:, :, 2]]).astype(np.int64)
+        # walls left of each column of cells and right of the last one
+        vertical = np.concatenate([board[:, :, 3], board[:, -1:, 1]], axis=1).astype(np.int64)
+        degrees[:, :-1] += horizontal
+        degrees[:, 1:] += horizontal
+        degrees[:-1, :] += vertical
+        degrees[1:, :] += vertical
+        return degrees
+
+    def set_barriers(self, boards, moves, degrees):
+        """
+        Put the barriers of the moves on the boards, in place.
+
+        Returns
+        -------
+        closing : numpy.ndarray of bool, shape (B,)
+            Whether both ends of the new barrier touched other walls, the only way it
+            can split a region.
+        """
+        index = np.arange(boards.shape[0])
+        r, c, dir = moves[:, 0], moves[:, 1], moves[:, 2]
+        boards[index, r, c, dir] = True
+        boards[index, r + MOVE_ROWS[dir], c + MOVE_COLS[dir], OPPOSITE_DIRS[dir]] = True
+        end_r = r[:, None] + END_ROWS[dir]
+        end_c = c[:, None] + END_COLS[dir]
+        ends = degrees[index[:, None], end_r, end_c]
+        degrees[index[:, None], end_r, end_c] = ends + 1
+        return (ends > 0).all(axis=1)
+
+    def scores(self, boards, my_pos, adv_pos):
+        """
+        Check which games ended.
+
+        Returns
+        -------
+        ended : numpy.ndarray of bool, shape (B,)
+            Whether the players are separated.
+        score : numpy.ndarray of int, shape (B,)
+            1 if the player at my_pos has the larger region, -1 if the smaller, 0 on a tie.
+        """
+        n_boards, board_size = boards.shape[:2]
+        n_cells = board_size * board_size
+        index = np.arange(n_boards)
+        labels = label_regions(boards).reshape(n_boards, n_cells)
+        sizes = np.bincount(
+            (labels + (index * n_cells)[:, None]).ravel(), minlength=n_boards * n_cells
+        ).reshape(n_boards, n_cells)
+        my_label = labels[index, my_pos[:, 0] * board_size + my_pos[:, 1]]
+        adv_label = labels[index, adv_pos[:, 0] * board_size + adv_pos[:, 1]]
+        score = np.sign(sizes[index, my_label] - sizes[index, adv_label])
+        return my_label != adv_label, score
+
+    def run(self, chess_board, my_pos, adv_pos, max_step, max_moves=None):
+        """
+        Play batch_size random playouts from a position.
+
+        Parameters
+        ----------
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4) or BitBoard
+            The chess board, left unchanged.
+        my_pos : tuple of int
+            The position of the player to move.
+        adv_pos : tuple of int
+            The position of its adversary.
+        max_step : int
+            The maximum number of steps of a move.
+        max_moves : int, optional
+            The maximum number of moves of a playout, defaults to self.max_moves.
+
+        Returns
+        -------
+        outcomes : numpy.ndarray of int, shape (batch_size,)
+            1 if the player to move won the playout, -1 if it lost, 0 on a tie or
+            if the playout reached max_moves.
+        """
+        if max_moves is None:
+            max_moves = self.max_moves
+        board = np.asarray(chess_board, dtype=bool)
+        boards = np.broadcast_to(board, (self.batch_size,) + board.shape).copy()
+        degrees = np.broadcast_to(
+            self.corner_degrees(board), (self.batch_size,) + (board.shape[0] + 1,) * 2
+        ).copy()
+        mover = np.tile(np.asarray(my_pos, dtype=np.int64), (self.batch_size, 1))
+        other = np.tile(np.asarray(adv_pos, dtype=np.int64), (self.batch_size, 1))
+        games = np.arange(self.batch_size)  # playouts still running
+        outcomes = np.zeros(self.batch_size, dtype=np.int64)
+        sign = 1  # 1 when the player to move is the one of the starting position
+        for _ in range(max_moves):
+            moves = self.random_moves(boards, mover, other, max_step)
+            closing = self.set_barriers(boards, moves, degrees)
+            mover = moves[:, :2]
+            ended = np.zeros(len(games), dtype=bool)
+            if closing.any():
+                ended[closing], score = self.scores(
+                    boards[closing], mover[closing], other[closing]
+                )
+                outcomes[games[ended]] = sign * score[ended[closing]]
+            going = ~ended
+            if not going.any():
+                break
+            if not going.all():
+                boards, degrees, mover, other, games = (
+                    boards[going], degrees[going], mover[going], other[going], games[going]
+                )
+            mover, other = other, mover
+            sign = -sign
+        return outcomes
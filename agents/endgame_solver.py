@@ -0,0 +1,152 @@
+import time
+from copy import deepcopy
+from connectivity import RegionTracker, check_separation
+from constants import MOVES, OPPOSITES
+from movegen import legal_moves
+from agents.rollout import HeuristicRollout
+from agents.transposition import Zobrist
+
+# Bounds stored in the table with the value of a position
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SearchAborted(Exception):
+    """
+    Raised when the solver runs out of nodes or time.
+    """
+
+
+class EndgameSolver:
+    """
+    Exact alpha-beta search of the end of a game.
+
+    Positions are valued 1, 0 or -1 for a win, a tie or a loss of the player to
+    move, so the search stops at the first winning move. Moves are tried in the
+    order of the heuristic of HeuristicRollout, after the best move stored in the
+    transposition table. The table holds proven values only and is kept between
+    calls, as they don't depend on the search that found them.
+
+    Parameters
+    ----------
+    board_size : int
+        The size of the board.
+    rng : numpy.random.Generator
+        The random generator used to draw the Zobrist keys.
+    max_nodes : int
+        The maximum number of positions searched by one call to solve.
+    table_size : int
+        The maximum number of positions in the transposition table.
+    """
+
+    def __init__(self, board_size, rng, max_nodes=20000, table_size=200000):
+        self.zobrist = Zobrist(board_size, rng)
+        self.max_nodes = max_nodes
+        self.table_size = table_size
+        self.table = {}  # state key -> (value, bound, best move)
+        self.ordering = HeuristicRollout()
+        self.nodes = 0
+
+    def solve(self, chess_board, my_pos, adv_pos, max_step, time_limit=None):
+        """
+        Search the position until its value is proven.
+
+        Parameters
+        ----------
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4) or BitBoard
+            The chess board, left unchanged.
+        my_pos : tuple of int
+            The position of the player to move.
+        adv_pos : tuple of int
+            The position of its adversary.
+        max_step : int
+            The maximum number of steps of a move.
+        time_limit : float, optional
+            The maximum duration of the search, in seconds.
+
+        Returns
+        -------
+        result : (int, ((int, int), int)) or None
+            The value of the position for the player to move and a move achieving
+            it, or None if the search ran out of nodes or time.
+        """
+        my_pos = (int(my_pos[0]), int(my_pos[1]))
+        adv_pos = (int(adv_pos[0]), int(adv_pos[1]))
+        self.board = deepcopy(chess_board)  # walls are added in place and removed on the way back
+        self.max_step = max_step
+        self.nodes = 0
+        self.deadline = None if time_limit is None else time.monotonic() + time_limit
+        board_hash = self.zobrist.hash_board(chess_board)
+        region_size = RegionTracker(chess_board).region_size(my_pos)
+        try:
+            return self.negamax(board_hash, my_pos, adv_pos, region_size, -1, 1)
+        except SearchAborted:
+            return None
+
+    def negamax(self, board_hash, my_pos, adv_pos, region_size, alpha, beta):
+        """
+        Value of the position for the player at my_pos, within the window (alpha, beta),
+        and its best move.
+        """
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise SearchAborted
+        if self.deadline is not None and self.nodes % 256 == 0:
+            if time.monotonic() > self.deadline:
+                raise SearchAborted
+
+        key = self.zobrist.state_key(board_hash, my_pos, adv_pos, True)
+        stored = self.table.get(key)
+        table_move = None
+        if stored is not None:
+            value, bound, table_move = stored
+            if bound == EXACT:
+                return value, table_move
+            if bound == LOWER and value >= beta:
+                return value, table_move
+            if bound == UPPER and value <= alpha:
+                return value, table_move
+
+        moves = legal_moves(self.board, my_pos, adv_pos, self.max_step)
+        moves = self.ordering.top_moves(moves, self.board, adv_pos, len(moves))
+        if table_move is not None:
+            moves.remove(table_move)
+            moves.insert(0, table_move)
+
+        board = self.board
+        alpha_orig = alpha
+        best_value, best_move = -2, None
+        for move in moves:
+            (r, c), dir = move
+            m_r, m_c = MOVES[dir]
+            board[r, c, dir] = True
+            board[r + m_r, c + m_c, OPPOSITES[dir]] = True
+            ended, value, new_region = check_separation(
+                board, r, c, dir, (r, c), adv_pos, region_size
+            )
+            if not ended:
+                value = -self.negamax(
+                    board_hash ^ self.zobrist.barrier(r, c, dir),
+                    adv_pos,
+                    (r, c),
+                    new_region,
+                    -beta,
+                    -alpha,
+                )[0]
+            board[r, c, dir] = False
+            board[r + m_r, c + m_c, OPPOSITES[dir]] = False
+            if value > best_value:
+                best_value, best_move = value, move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= alpha_orig:
+            bound = UPPER
+        elif best_value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        if len(self.table) >= self.table_size:
+            self.table.clear()
+        self.table[key] = (best_value, bound, best_move)
+        return best_value, best_move
@@ -9,6 +9,8 @@ class HumanAgent(Agent):
     def __init__(self):
         super(HumanAgent, self).__init__()
         self.name = "HumanAgent"
+        # Only reads the chess board, no need for a copy
+        self.mutable_board = False
         self.dir_map = {
             "u": 0,
             "r": 1,
@@ -0,0 +1,211 @@
+import atexit
+import multiprocessing
+import traceback
+from copy import deepcopy
+import numpy as np
+from agents.agent import Agent
+from bitboard import BitBoard
+from store import AGENT_REGISTRY
+from utils import readonly_board
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Remote agents with a live worker, closed when the interpreter exits
+_live_agents = set()
+
+
+def agent_worker(conn, agent_name):
+    """
+    Loop of the worker process of a RemoteAgent.
+
+    The worker keeps its own copy of the chess board of the current game and
+    answers the messages of the RemoteAgent:
+
+    - ("game", seed, chess_board, bitboard): start a game with a fresh agent,
+      seeded with seed, on a copy of chess_board. No answer.
+    - ("step", walls, my_pos, adv_pos, max_step): add the walls, an array of
+      (r, c, dir) rows, to the board and step the agent. Answers
+      ("move", next_pos, dir, metrics, max_rss) or ("error", traceback).
+    - ("close",): exit.
+    """
+    agent = AGENT_REGISTRY[agent_name]()
+    conn.send(("ready", agent.autoplay))
+    board = None
+    error = None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == "close":
+            break
+        if message[0] == "game":
+            _, seed, chess_board, bitboard = message
+            try:
+                agent = AGENT_REGISTRY[agent_name]()
+                agent.set_seed(seed)
+                board = BitBoard.from_array(chess_board) if bitboard else chess_board
+                error = None
+            except Exception:
+                error = traceback.format_exc()
+            continue
+        _, walls, my_pos, adv_pos, max_step = message
+        if error is not None:
+            conn.send(("error", error))
+            continue
+        try:
+            for r, c, dir in walls:
+                board[r, c, dir] = True
+            if getattr(agent, "mutable_board", True):
+                agent_board = deepcopy(board)
+            else:
+                agent_board = readonly_board(board)
+            next_pos, dir = agent.step(agent_board, my_pos, adv_pos, max_step)
+            metrics = agent.get_metrics() if hasattr(agent, "get_metrics") else {}
+            max_rss = (
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+            )
+            conn.send(
+                ("move", tuple(int(x) for x in next_pos), int(dir), metrics or {}, max_rss)
+            )
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+    conn.close()
+
+
+class RemoteAgent(Agent):
+    """
+    Proxy of a registered agent living in a worker process.
+
+    The worker is started once and reused across games: World calls set_seed
+    at the start of every game, which gives the worker a fresh agent and the
+    full chess board. Each step then only sends the walls added since the last
+    step and the positions. A crash or a memory leak of the agent stays in the
+    worker, which is restarted when it died, after max_games games, or once its
+    peak memory exceeds max_rss.
+
+    Parameters
+    ----------
+    agent_name : str
+        The registered name of the agent.
+    max_games : int, optional
+        The number of games after which the worker is restarted.
+    max_rss : int, optional
+        The peak resident memory of the worker, in kilobytes, after which it is
+        restarted at the next game.
+    """
+
+    def __init__(self, agent_name, max_games=None, max_rss=None):
+        super().__init__()
+        if agent_name not in AGENT_REGISTRY:
+            raise ValueError(f"Agent '{agent_name}' is not registered.")
+        self.name = agent_name
+        # The world only reads the board, walls are sent to the worker
+        self.mutable_board = False
+        self.max_games = max_games
+        self.max_rss = max_rss
+        self.process = None
+        self.conn = None
+        self.games = 0
+        self.worker_rss = 0
+        self.restarts = 0
+        self.board = None
+        self.pending = False
+        self.metrics = {}
+        self.start()
+
+    def start(self):
+        """
+        Start a new worker process, closing the current one.
+        """
+        if self.process is not None:
+            self.close()
+            self.restarts += 1
+        self.conn, worker_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=agent_worker, args=(worker_conn, self.name)
+        )
+        self.process.start()
+        worker_conn.close()
+        _, self.autoplay = self.conn.recv()
+        self.games = 0
+        self.worker_rss = 0
+        self.pending = False
+        _live_agents.add(self)
+
+    def close(self):
+        """
+        Stop the worker process.
+        """
+        _live_agents.discard(self)
+        if self.process is None:
+            return
+        if self.process.is_alive() and not self.pending:
+            try:
+                self.conn.send(("close",))
+                self.process.join(1)
+            except (BrokenPipeError, OSError):
+                pass
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def set_seed(self, seed):
+        """
+        Start a new game, called by the world with the seed of the agent.
+        """
+        if (
+            self.process is None
+            or not self.process.is_alive()
+            # a late step of the previous game would answer the next message
+            or self.pending
+            or (self.max_games is not None and self.games >= self.max_games)
+            or (self.max_rss is not None and self.worker_rss > self.max_rss)
+        ):
+            self.start()
+        self.games += 1
+        self.seed = seed
+        self.board = None
+
+    def step(self, chess_board, my_pos, adv_pos, max_step):
+        board = np.asarray(chess_board, dtype=bool)
+        if self.board is None:
+            # first step of the game, the worker gets the whole board
+            self.conn.send(
+                ("game", self.seed, board.copy(), isinstance(chess_board, BitBoard))
+            )
+            walls = np.zeros((0, 3), dtype=np.int64)
+        else:
+            walls = np.argwhere(board & ~self.board)
+        self.board = board.copy()
+        # a step that timed out may still be waiting here when a new worker starts
+        conn = self.conn
+        self.pending = True
+        try:
+            conn.send(("step", walls, tuple(my_pos), tuple(adv_pos), max_step))
+            answer = conn.recv()
+        except (EOFError, OSError):
+            raise RuntimeError(f"The worker of {self.name} died")
+        finally:
+            if conn is self.conn:
+                self.pending = False
+        if answer[0] == "error":
+            raise RuntimeError(f"Step of {self.name} failed in its worker:\n{answer[1]}")
+        _, next_pos, dir, metrics, self.worker_rss = answer
+        self.metrics = dict(metrics, worker_rss=self.worker_rss, worker_restarts=self.restarts)
+        return next_pos, dir
+
+    def get_metrics(self):
+        return self.metrics
+
+
+@atexit.register
+def close_remote_agents():
+    for agent in list(_live_agents):
+        agent.close()
@@ -0,0 +1,141 @@
+class RolloutPolicy:
+    """
+    Chooses the moves of the simulations once they leave the search tree.
+    Extend this class and pass it as rollout=... to MonteCarlo to change how
+    positions are evaluated.
+    """
+
+    def choose_move(self, moves, chess_board, my_pos, adv_pos, rng):
+        """
+        Choose the next move of a simulation.
+
+        Parameters
+        ----------
+        moves : list of ((int, int), int)
+            The legal moves of the player to move.
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4) or BitBoard
+            The chess board.
+        my_pos : tuple of int
+            The position of the player to move.
+        adv_pos : tuple of int
+            The position of its adversary.
+        rng : numpy.random.Generator
+            The random generator of the search.
+
+        Returns
+        -------
+        move : ((int, int), int)
+            One of the legal moves.
+        """
+        raise NotImplementedError
+
+
+class RandomRollout(RolloutPolicy):
+    """
+    Uniformly random moves.
+    """
+
+    def choose_move(self, moves, chess_board, my_pos, adv_pos, rng):
+        return moves[rng.integers(0, len(moves))]
+
+
+class HeuristicRollout(RolloutPolicy):
+    """
+    Cheap informed moves: stay close to the adversary to restrict it, put walls
+    between the two players, and avoid walls that leave our own cell a dead end.
+    Ties are broken at random.
+
+    Parameters
+    ----------
+    dead_end_penalty : float
+        Penalty of a wall that leaves three walls around our cell.
+    enclosed_penalty : float
+        Penalty of a wall that closes our cell completely.
+    facing_bonus : float
+        Bonus of a wall on the side of the adversary.
+    """
+
+    def __init__(self, dead_end_penalty=3.0, enclosed_penalty=100.0, facing_bonus=1.5):
+        self.dead_end_penalty = dead_end_penalty
+        self.enclosed_penalty = enclosed_penalty
+        self.facing_bonus = facing_bonus
+
+    def score(self, move, n_walls, adv_pos):
+        """
+        Heuristic value of a move, higher is better.
+
+        Parameters
+        ----------
+        move : ((int, int), int)
+            The move.
+        n_walls : int
+            The number of walls around the end position of the move, before it.
+        adv_pos : tuple of int
+            The position of the adversary.
+        """
+        (r, c), dir = move
+        a_r, a_c = adv_pos
+        d_r, d_c = a_r - r, a_c - c
+        # Closer to the adversary restricts its area
+        value = -float(abs(d_r) + abs(d_c))
+        # Walls facing the adversary cut it off from our side
+        if (dir == 0 and d_r < 0) or (dir == 2 and d_r > 0):
+            value += self.facing_bonus
+        elif (dir == 3 and d_c < 0) or (dir == 1 and d_c > 0):
+            value += self.facing_bonus
+        if n_walls == 3:
+            value -= self.enclosed_penalty
+        elif n_walls == 2:
+            value -= self.dead_end_penalty
+        return value
+
+    def values(self, moves, chess_board, adv_pos):
+        """
+        Heuristic values of a list of moves, counting the walls of each end position once.
+        """
+        walls = {} # nb of walls around each end position
+        values = []
+        for move in moves:
+            pos = move[0]
+            if pos not in walls:
+                walls[pos] = sum(bool(chess_board[pos[0], pos[1], d]) for d in range(4))
+            values.append(self.score(move, walls[pos], adv_pos))
+        return values
+
+    def top_moves(self, moves, chess_board, adv_pos, k):
+        """
+        The k best moves by heuristic value, best first. The sort is stable, so the
+        result is deterministic for a given list of moves.
+        """
+        values = self.values(moves, chess_board, adv_pos)
+        order = sorted(range(len(moves)), key=lambda i: -values[i])
+        return [moves[i] for i in order[:k]]
+
+    def choose_move(self, moves, chess_board, my_pos, adv_pos, rng):
+        values = self.values(moves, chess_board, adv_pos)
+        best_value = max(values)
+        best_moves = [move for move, value in zip(moves, values) if value == best_value]
+        return best_moves[rng.integers(0, len(best_moves))]
+
+
+class EpsilonGreedyRollout(RolloutPolicy):
+    """
+    Mix of a greedy policy and random moves.
+
+    Parameters
+    ----------
+    policy : RolloutPolicy
+        The policy followed with probability 1 - epsilon.
+    epsilon : float
+        The probability of a uniformly random move.
+    """
+
+    def __init__(self, policy=None, epsilon=0.5):
+        self.policy = HeuristicRollout() if policy is None else policy
+        self.epsilon = epsilon
+        self.random = RandomRollout()
+
+    def choose_move(self, moves, chess_board, my_pos, adv_pos, rng):
+        if rng.random() < self.epsilon:
+            return self.random.choose_move(moves, chess_board, my_pos, adv_pos, rng)
+        return self.policy.choose_move(moves, chess_board, my_pos, adv_pos, rng)
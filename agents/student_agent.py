@@ -1,11 +1,26 @@
 # Student agent: Add your own agent here
 from agents.agent import Agent
+import numpy as np
 from store import register_agent
+from movegen import legal_moves
+from constants import MOVES, OPPOSITES
+from connectivity import RegionTracker, check_separation
+from agents.transposition import Zobrist, TranspositionTable
+from agents.rollout import HeuristicRollout, EpsilonGreedyRollout
+from agents.time_manager import TimeManager
+from agents.endgame_solver import EndgameSolver
+from agents.batch_rollout import BatchRollout
+import os
 import sys
+import time
+import atexit
+import itertools
+import logging
+import multiprocessing
 from copy import deepcopy
-from random import randint, choice
 from math import log, sqrt
-from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
 
 @register_agent("student_agent")
 class StudentAgent(Agent):
@@ -13,9 +28,11 @@ class StudentAgent(Agent):
     A dummy class for your implementation. Feel free to use this class to
     add any helper functionalities needed for your agent.
     """
-    def __init__(self):
+    def __init__(self, workers=None):
         super(StudentAgent, self).__init__()
         self.name = "StudentAgent"
+        # Only reads the chess board, no need for a copy
+        self.mutable_board = False
         self.dir_map = {
             "u": 0,
             "r": 1,
@@ -24,6 +41,13 @@ class StudentAgent(Agent):
         }
         self.monte_carlo = None # initialize
         self.autoplay = True 
+        # nb of processes searching in parallel, set MCTS_WORKERS to use more than one
+        self.workers = workers if workers is not None else int(os.environ.get("MCTS_WORKERS", 1))
+        self.solver = None # exact search of the endgame
+        self.solver_threshold = 40 # below this many legal moves, try to solve the game
+        self.solver_region = 30 # ... if the region left to play in is this small, the game is short enough
+        self.solver_time = 0.3 # seconds spent trying to solve before falling back on MCTS
+        self.metrics = {} # statistics of the last step, see get_metrics
 
     def step(self, chess_board, my_pos, adv_pos, max_step):
         """
@@ -41,14 +65,46 @@ class StudentAgent(Agent):
         Please check the sample implementation in agents/random_agent.py or agents/human_agent.py for more details.
         """
         while self.monte_carlo is None: 
-            self.monte_carlo = MonteCarlo(chess_board, my_pos, adv_pos, max_step)
-        play = self.monte_carlo.get_play(chess_board, my_pos, adv_pos, max_step)
+            self.monte_carlo = MonteCarlo(chess_board, my_pos, adv_pos, max_step, rng=self.rng, workers=self.workers)
+            self.solver = EndgameSolver(chess_board.shape[0], self.rng)
+
+        # few moves left in a small region, the game can usually be solved exactly in a few milliseconds
+        begin = time.monotonic()
+        self.metrics = {"solved": False}
+        if (len(legal_moves(chess_board, my_pos, adv_pos, max_step)) < self.solver_threshold
+                and RegionTracker(chess_board).region_size(my_pos) <= self.solver_region):
+            result = self.solver.solve(chess_board, my_pos, adv_pos, max_step, self.solver_time)
+            self.metrics["solver_nodes"] = self.solver.nodes
+            # a proven loss is left to MCTS, which still plays for the adversary's mistakes
+            if result is not None and result[0] >= 0:
+                self.monte_carlo.preprocessing = False # the first move's extra time is gone
+                self.metrics["solved"] = True
+                return result[1]
+
+        play = self.monte_carlo.get_play(chess_board, my_pos, adv_pos, max_step, time.monotonic() - begin)
+        self.metrics.update(self.monte_carlo.get_metrics())
 
         my_pos = play[0]
         dir = play[1]
 
         return my_pos, dir
 
+    def set_seed(self, seed):
+        """
+        called by the world at the start of every game, the search and the solver are sized to
+        the board so they are rebuilt on the next step, with the new random generator
+        """
+        super(StudentAgent, self).set_seed(seed)
+        self.monte_carlo = None
+        self.solver = None
+
+    def get_metrics(self):
+        """
+        returns the statistics of the last step: whether the endgame solver played it,
+        otherwise those of the MCTS search
+        """
+        return self.metrics
+
 class MonteCarlo:
     """
     MCTS algorithm
@@ -62,262 +118,385 @@ class MonteCarlo:
         self.adv_pos = adv_pos
         self.max_step = max_step
 
-        self.compute_time = timedelta(seconds=(kwargs.get('time', 1.90))) # time allowed for each move
+        # splits the time of the game between the moves, 'time' is allowed for each move after the first one
+        self.time_manager = kwargs.get("time_manager", TimeManager(move_time=kwargs.get('time', 1.90)))
         self.preprocessing = True # set to False once setup is over
         self.max_moves = kwargs.get('max_moves', 100) # maximum moves allowed in simulations
 
         self.C = kwargs.get("C", 1.3) # set constant in UCT
+        self.rng = kwargs.get("rng", np.random.default_rng()) # random generator of the agent
+        self.rollout = kwargs.get("rollout", EpsilonGreedyRollout(epsilon=0.5)) # policy of the simulations outside the tree
+        # if set, the leaves are evaluated by this many random playouts run together as arrays
+        batch_rollouts = kwargs.get("batch_rollouts", 0)
+        self.batch_rollout = BatchRollout(batch_rollouts, self.max_moves, self.rng) if batch_rollouts else None
+        self.top_k = kwargs.get("top_k", None) # if set, only the top_k moves by heuristic are expanded in the tree
+        self.ordering = HeuristicRollout() # heuristic used to prune the moves of the tree
+        self.workers = kwargs.get("workers", 1) # nb of processes running independent searches
+        # settings passed on to the searches of the worker processes
+        self.settings = {k: kwargs[k] for k in ("max_moves", "C", "tt_size", "rollout", "top_k", "time_manager", "batch_rollouts") if k in kwargs}
+        self.token = (os.getpid(), next(_search_tokens)) # identifies this search in the worker processes, never reused
+
+        # statistics of the positions searched, kept between turns and shared by transpositions
+        self.zobrist = Zobrist(chess_board.shape[0], self.rng)
+        self.tt = TranspositionTable(kwargs.get("tt_size", 200000))
+        self.root = None
+        self.root_hash = None # hash of the walls of the current board
+        self.root_key = None
+        self.move_cache = {} # legal moves of the positions of the tree, by state key, for the current search
+
+    def get_play(self, chessboard, my_pos, adv_pos, max_step, spent=0.0):
+        """
+        Calculate best play for the current game state by running simulations during alloted time
+        and returns play as a tuple ((x,y), dir), spent is the time already used for this move
+        """
+        # size of the region shared by both players, tells the phase of the game
+        region_size = RegionTracker(chessboard).region_size(my_pos)
+        # if first turn of the game, we have more time to setup
+        clock = self.time_manager.start_move(self.preprocessing, region_size / chessboard.shape[0]**2, spent)
+        self.preprocessing = False
+
+        # root parallelization: the workers search the same position independently
+        pending = self.start_workers(chessboard, my_pos, adv_pos, max_step, clock)
+        self.search(chessboard, my_pos, adv_pos, max_step, clock, region_size)
+        stats = self.root_stats()
+        for result in pending:
+            for move, (wins, plays) in result.get().items():
+                total = stats.setdefault(move, [0, 0])
+                total[0] += wins
+                total[1] += plays
+
+        # best play is the most simulated one, as the search stops early when its lead is safe
+        play = None
+        most_plays = 0
+        for move, (wins, plays) in stats.items():
+            if plays > most_plays:
+                play = move
+                most_plays = plays
+        if play is None: # not a single simulation, play randomly
+            play = self.get_random_move(self.chess_board, self.my_pos, self.adv_pos, self.max_step)
 
-        self.wins = {} # wins from simulations
-        self.plays = {} # plays from simulations
-        self.playcount = 0 
+        return play
 
-    def get_play(self, chessboard, my_pos, adv_pos, max_step):
+    def search(self, chessboard, my_pos, adv_pos, max_step, clock, region_size=None):
         """
-        Calculate best play for the current game state by running simulations during alloted time
-        and returns play as a tuple ((x,y), dir)
+        Runs simulations from the given position until the MoveClock clock says to stop
         """
         self.chess_board = chessboard
         self.my_pos = my_pos
         self.adv_pos = adv_pos
         self.max_step = max_step
-        player = True 
-        self.playcount += 1
-        self.max_depth = 0
-
-        begin = datetime.utcnow()
-        if self.preprocessing: # if first turn of the game, we have more time to setup
-            time = timedelta(seconds = 29.90) 
-            self.preprocessing = False
-        else:
-            time = self.compute_time
-
-        while datetime.utcnow() - begin < time: # during the alloted time
-            self.run_sim() # run simulation
-
-        # sample a list of legal random moves from our current position on the board
-        legal_moves = self.get_moves(self.chess_board, self.my_pos, self.adv_pos, self.max_step)
-
-        play_states = [(move, (move, self.playcount)) for move in legal_moves]
-        play, state = play_states[0]
-
-        # calculate best play from simulation using wins/total plays
-        win_percentage = self.wins.get((player, state), 0)/self.plays.get((player, state), 1)
-        for p, state in play_states[1:]:
-            if self.wins.get((player, state), 0)/self.plays.get((player, state), 1) > win_percentage:
-                # update best play and wr%
-                play = p
-                win_percentage = self.wins.get((player, state), 0)/self.plays.get((player, state), 1)
-        
-        self.playcount += 1 # +1 turn
-
-        # for debugging purposes    
-        # print("Max depth reached:", self.max_depth)
-        # print("Time taken:", datetime.utcnow() - begin)
+        self.max_depth = 0 # deepest position of the tree reached by the search
+        self.n_expanded = 0 # positions added to the tree by the search
+        self.n_sims = 0
+        self.search_lookups = (self.tt.hits, self.tt.misses)
+
+        # look up the current position, its statistics carry over from previous searches
+        self.tt.new_search()
+        self.root_hash = self.zobrist.hash_board(chessboard)
+        root_key = self.zobrist.state_key(self.root_hash, my_pos, adv_pos, True)
+        self.root = self.tt.get(root_key) or self.tt.store(root_key)
+        self.root_key = root_key
+        self.move_cache = {}
+
+        # one scratch board for all the simulations, restored after each of them
+        self.scratch_board = deepcopy(chessboard)
+        # size of the region shared by both players, updated by the simulations when walls split it
+        if region_size is None:
+            region_size = RegionTracker(chessboard).region_size(my_pos)
+        self.root_region = region_size
+
+        while not clock.should_stop(self.n_sims, self.root_visits()): # the clock is read once per batch
+            for _ in range(clock.batch_size):
+                self.run_sim() # run simulation
+            self.n_sims += clock.batch_size
+        self.search_time = clock.elapsed()
+
+    def get_metrics(self):
+        """
+        returns the statistics of the last search, as reported to the world by the agent
+        """
+        # lookups of this search only, the table's counters span the whole game
+        hits = self.tt.hits - self.search_lookups[0]
+        misses = self.tt.misses - self.search_lookups[1]
+        return {
+            "sims": self.n_sims,
+            "nodes": self.n_expanded,
+            "max_depth": self.max_depth,
+            "search_time": self.search_time,
+            "root_plays": self.root.plays,
+            "tt_size": len(self.tt),
+            "tt_hit_rate": hits / max(hits + misses, 1),
+            "tt_evictions": self.tt.evictions,
+        }
 
-        return play
+    def root_stats(self):
+        """
+        returns the [wins, plays] of every play searched from the root
+        """
+        stats = {}
+        for move, key in self.root.children.items():
+            entry = self.tt.peek(key)
+            if entry is not None:
+                stats[move] = [entry.wins, entry.plays]
+        return stats
+
+    def root_visits(self):
+        """
+        returns the plays of every legal move of the root, 0 for the moves not expanded yet
+        """
+        if self.root.n_moves is None:
+            return []
+        visits = [0] * (self.root.n_moves - len(self.root.children))
+        for key in self.root.children.values():
+            entry = self.tt.peek(key)
+            visits.append(entry.plays if entry is not None else 0)
+        return visits
+
+    def start_workers(self, chessboard, my_pos, adv_pos, max_step, clock):
+        """
+        Starts the searches of the worker processes, which stop at the same time as ours,
+        returns their pending results
+        """
+        if self.workers <= 1:
+            return []
+        pool = get_pool(self.workers - 1)
+        if pool is None: # no worker processes available, search alone
+            self.workers = 1
+            return []
+        return [
+            pool.apply_async(
+                worker_search,
+                ((self.token, chessboard, my_pos, adv_pos, max_step, clock,
+                  int(self.rng.integers(0, 2**63)), self.settings),),
+            )
+            for _ in range(self.workers - 1)
+        ]
+
+    def select_move(self, entry):
+        """
+        returns the expanded move of entry with the highest UCB1 value,
+        or a move whose position was evicted from the table
+        """
+        log_calc = log(max(entry.plays, 1))
+        best_move = None
+        value = -1
+        for move, key in entry.children.items():
+            child = self.tt.peek(key)
+            if child is None or not child.plays:
+                return move
+            v = child.wins/child.plays + self.C*sqrt(log_calc/child.plays)
+            if v > value:
+                value = v
+                best_move = move
+        return best_move
 
     def run_sim(self):
         """
         Simulates moves for as long as time allows or until
         maximum moves parameter is reached
         """
-        chessboard = deepcopy(self.chess_board) # to avoid modifying original board
+        chessboard = self.scratch_board # walls are added in place and undone at the end
+        undo = [] # walls added during the simulation
+        board_hash = self.root_hash
+        region_size = self.root_region
         plyr_pos = self.my_pos
         enemy_pos = self.adv_pos
         max_step = self.max_step
 
-        visited_states = set() # to store already visited states in the simulation
+        entry = self.root
+        key = self.root_key
+        path = [(self.root, False)] # (entry, player who moved into it) visited in the tree
         player = True # our turn first
         winner = None # no winner at first
-        wins = self.wins # total wins
-        plays = self.plays # nb times visited
-        playcount = self.playcount
+        wins = None # wins of each player over a batch of playouts from the leaf
+        in_tree = True # False once we left the tree, for the rollout
 
-        node_expansion = True
-        
-        # selection
         for t in range(self.max_moves): # run simulation until maximum amount of moves is reached
-            legal_moves = self.get_moves(chessboard, plyr_pos, enemy_pos, max_step)
-            play_states = [(move, (move, playcount)) for move in legal_moves]
-
-            # Tree traversal
-            if all(plays.get((player, S)) for m, S in play_states): # if current state is not a leaf node
-                move, state = play_states[0]
-                value = 0
-                
-                # use UCB1 formula to decide which node to visit
-                log_calc = log(sum(plays[(player, S)] for  m, S in play_states))
-                for m, S in play_states[1:]:
-                    v = (wins[(player, S)]/plays[(player, S)])+self.C*sqrt(log_calc/plays[(player, S)])
-
-                    if v > value:
-                        value = v
-                        move = m
-                        state = S
-            
-            # leaf node
+            if in_tree:
+                untried = []
+                if entry.n_moves is None or len(entry.children) < entry.n_moves:
+                    legal_moves = self.get_tree_moves(key, chessboard, plyr_pos, enemy_pos, max_step)
+                    entry.n_moves = len(legal_moves)
+                    untried = [m for m in legal_moves if m not in entry.children]
+                if untried:
+                    move = untried[self.rng.integers(0, len(untried))] # expansion
+                elif entry.children:
+                    move = self.select_move(entry) # selection using UCB1
+                else:
+                    break
+            elif self.batch_rollout is not None:
+                # evaluate the new leaf with a batch of random playouts at once
+                outcomes = self.batch_rollout.run(chessboard, plyr_pos, enemy_pos, max_step, self.max_moves - t)
+                wins = {player: int((outcomes == 1).sum()), not player: int((outcomes == -1).sum())}
+                break
             else:
-                move, state = choice(play_states) # rollout
+                # rollout
+                legal_moves = self.get_moves(chessboard, plyr_pos, enemy_pos, max_step)
+                move = self.rollout.choose_move(legal_moves, chessboard, plyr_pos, enemy_pos, self.rng)
 
             play, dir = move
             r, c = play
-            chessboard = self.apply_move(chessboard, r, c, dir) # update state of chessboard from simulated move
+            self.make_move(chessboard, r, c, dir, undo) # update state of chessboard from simulated move
+            board_hash ^= self.zobrist.barrier(r, c, dir)
 
-            # expansion
-            if node_expansion and (player, state) not in self.plays: 
-                node_expansion = False # expand 1 state
-                self.plays[(player, state)] = 0
-                self.wins[(player, state)] = 0
-                # if t > self.max_depth: 
-                    # self.max_depth = t
-
-            visited_states.add((player, state)) # mark as visited
-
-            win, score = self.check_endgame(chessboard, plyr_pos, enemy_pos)
+            if in_tree:
+                # positions are keyed from our point of view, the adversary is to move after our play
+                if player:
+                    key = self.zobrist.state_key(board_hash, play, enemy_pos, False)
+                else:
+                    key = self.zobrist.state_key(board_hash, enemy_pos, play, True)
+                entry.children[move] = key
+                entry = self.tt.get(key)
+                if entry is None: # expand 1 new position and leave the tree
+                    entry = self.tt.store(key)
+                    in_tree = False
+                    self.n_expanded += 1
+                    if t + 1 > self.max_depth:
+                        self.max_depth = t + 1
+                path.append((entry, player))
+
+            # only the new wall can separate the players
+            win, score, region_size = self.check_separation(chessboard, r, c, dir, play, enemy_pos, region_size)
             if win:
                 if score == 1:
                     winner = player
-                else:
+                elif score == -1:
                     winner = not player
-                break
-            
-            # adversary's turn 
+                break # no winner on a tie
+
+            # adversary's turn
             plyr_pos = enemy_pos
             player = not player # switch to adversary
-            enemy_pos = play # adversary makes his play
-            playcount += 1
-        
+            enemy_pos = play # our play becomes the adversary's position
+
+        self.unmake_moves(chessboard, undo) # back to the root position
+
         # update/back-propagation
-        # after all simulations are finished, we update the total wins and plays of our simulation
-        for player, state in visited_states:
-            if (player, state) not in self.plays:
-                continue
-            self.plays[(player, state)] += 1
-
-            if winner is not None:
-                if player == winner:
-                    self.wins[(player, state)] += 1
-
-    def check_endgame(self, chess_board, my_pos, adv_pos):
-            """
-            Check if the game ends and compute the current score of the agents.
-
-            Returns
-            -------
-            is_endgame : bool
-                Whether the game ends.
-            player_1_score : int
-                The score of player 1.
-            player_2_score : int
-                The score of player 2.
-            """
-            board_size = chess_board.shape[0]
-            moves = ((-1, 0), (0, 1), (1, 0), (0, -1))
-
-            # Union-Find
-            father = dict()
-            for r in range(board_size):
-                for c in range(board_size):
-                    father[(r, c)] = (r, c)
-
-            def find(pos):
-                if father[pos] != pos:
-                    father[pos] = find(father[pos])
-                return father[pos]
-
-            def union(pos1, pos2):
-                father[pos1] = pos2
-
-            for r in range(board_size):
-                for c in range(board_size):
-                    for dir, move in enumerate(
-                        moves[1:3]
-                    ):  # Only check down and right
-                        if chess_board[r, c, dir + 1]:
-                            continue
-                        pos_a = find((r, c))
-                        pos_b = find((r + move[0], c + move[1]))
-                        if pos_a != pos_b:
-                            union(pos_a, pos_b)
-
-            for r in range(board_size):
-                for c in range(board_size):
-                    find((r, c))
-            p0_r = find(tuple(my_pos))
-            p1_r = find(tuple(adv_pos))
-            p0_score = list(father.values()).count(p0_r)
-            p1_score = list(father.values()).count(p1_r)
-            if p0_r == p1_r:
-                return False, 0
-            if p0_score == p1_score:
-                return True, 0
-            return True, max(0, (p0_score-p1_score)/abs(p0_score-p1_score))
-    
-    def apply_move(self, chess_board, r, c, dir):
-        """
-        returns board state from a simulated move
-        """
-        # Moves (Up, Right, Down, Left)
-        moves = ((-1, 0), (0, 1), (1, 0), (0, -1))
-
-        # Opposite Directions
-        opposites = {0: 2, 1: 3, 2: 0, 3: 1} 
-
-        board = deepcopy(chess_board) # copy current state of the board
-        # simulate barrier on one side
-        board[r, c, dir] = True
-        move = moves[dir]
-
-        # simulate barrier on opposite side
-        board[r + move[0], c + move[1], opposites[dir]] = True
-
-        return board # return state of the board
+        # after the simulation is finished, we update the wins and plays of the positions visited
+        if wins is not None:
+            for entry, player in path:
+                entry.plays += self.batch_rollout.batch_size
+                entry.wins += wins[player]
+            return
+        for entry, player in path:
+            entry.plays += 1
+            if winner is not None and player == winner:
+                entry.wins += 1
+
+    def check_separation(self, chess_board, r, c, dir, my_pos, adv_pos, region_size):
+        """
+        Checks if the wall just put at (r, c, dir) by the player at my_pos separated the players,
+        searching from both sides of the wall instead of the whole board.
+        Zones are only counted when the wall splits the players' region, of size region_size.
+
+        Returns
+        -------
+        is_endgame : bool
+            Whether the game ends.
+        score : int
+            1 if the player at my_pos wins, -1 if it loses, 0 on a tie or if the game goes on.
+        region_size : int
+            The size of the region shared by the players if the game goes on.
+        """
+        return check_separation(chess_board, r, c, dir, my_pos, adv_pos, region_size)
+
+    def make_move(self, chess_board, r, c, dir, undo):
+        """
+        simulates a move in place and records it on the undo stack
+        """
+        m_r, m_c = MOVES[dir]
+        chess_board[r, c, dir] = True
+        chess_board[r + m_r, c + m_c, OPPOSITES[dir]] = True
+        undo.append((r, c, dir))
+
+    def unmake_moves(self, chess_board, undo):
+        """
+        removes the walls of the undo stack from the board, in reverse order
+        """
+        while undo:
+            r, c, dir = undo.pop()
+            m_r, m_c = MOVES[dir]
+            chess_board[r, c, dir] = False
+            chess_board[r + m_r, c + m_c, OPPOSITES[dir]] = False
 
     def get_moves(self, chess_board, my_pos, adv_pos, max_step):
         """
-        returns a list of random moves from sampling
+        returns the list of all legal moves, enumerated with a single BFS
         """
-        moves = set()
-        for i in range(max_step*4): # times 4
-            moves.add(self.get_random_move(chess_board, my_pos, adv_pos, max_step))
+        return legal_moves(chess_board, my_pos, adv_pos, max_step)
 
-        return list(moves)
+    def get_tree_moves(self, key, chess_board, my_pos, adv_pos, max_step):
+        """
+        returns the moves expanded from a position of the tree, cached by state key for the search
+        so that its children are always the same, pruned to the top_k moves by heuristic if set
+        """
+        moves = self.move_cache.get(key)
+        if moves is None:
+            moves = self.get_moves(chess_board, my_pos, adv_pos, max_step)
+            if self.top_k is not None and len(moves) > self.top_k:
+                moves = self.ordering.top_moves(moves, chess_board, adv_pos, self.top_k)
+            if len(self.move_cache) >= self.tt.capacity: # bounded like the table
+                self.move_cache.clear()
+            self.move_cache[key] = moves
+        return moves
+
+    def choice(self, seq):
+        """
+        returns a random element of a sequence, drawn from the agent's random generator
+        """
+        return seq[self.rng.integers(0, len(seq))]
 
     def get_random_move(self, chess_board, my_pos, adv_pos, max_step):
         """
         returns a random move as a tuple ((x,y),dir)
         """
-        # Moves (Up, Right, Down, Left)
-        ori_pos = deepcopy(my_pos)
-        moves = ((-1, 0), (0, 1), (1, 0), (0, -1))
-        steps = randint(0, max_step)
-
-        # Random Walk
-        for _ in range(steps):
-            r, c = my_pos
-            dir = randint(0, 3)
-            m_r, m_c = moves[dir]
-            my_pos = (r + m_r, c + m_c)
-
-            # Special Case enclosed by Adversary
-            k = 0
-            while chess_board[r, c, dir] or my_pos == adv_pos:
-                k += 1
-                if k > 300:
-                    break
-                dir = randint(0, 3)
-                m_r, m_c = moves[dir]
-                my_pos = (r + m_r, c + m_c)
+        return self.choice(self.get_moves(chess_board, my_pos, adv_pos, max_step))
+
 
-            if k > 300:
-                my_pos = ori_pos
-                break
 
-        # Put Barrier
-        dir = randint(0, 3)
-        r, c = my_pos
-        while chess_board[r, c, dir]:
-            dir = randint(0, 3)
+# Worker processes of the root parallel search, shared by all the agents of the process
+_pool = None
+_pool_size = 0
+# MonteCarlo searches of a worker process, by token of the agent's search
+_worker_searches = {}
+# numbers the searches of the process, unlike id() they are not reused once a search is freed
+_search_tokens = itertools.count()
 
-        return my_pos, dir
\ No newline at end of file
+def get_pool(n_processes):
+    """
+    returns a pool of n_processes worker processes, or None if processes can't be started here
+    """
+    global _pool, _pool_size
+    if _pool is not None and _pool_size == n_processes:
+        return _pool
+    if multiprocessing.current_process().daemon:
+        # e.g. inside a worker of the simulator's autoplay pool
+        logger.warning("Cannot start MCTS worker processes from a daemon process, searching in a single process")
+        return None
+    if _pool is not None:
+        _pool.terminate()
+    _pool = multiprocessing.Pool(n_processes)
+    _pool_size = n_processes
+    atexit.register(_pool.terminate)
+    return _pool
+
+def worker_search(job):
+    """
+    Runs an independent search in a worker process and returns the [wins, plays] of the root plays
+    """
+    token, chess_board, my_pos, adv_pos, max_step, clock, seed, settings = job
+    mc = _worker_searches.get(token)
+    if mc is not None and mc.zobrist.board_size != chess_board.shape[0]: # stale search of another board
+        del _worker_searches[token]
+        mc = None
+    if mc is None:
+        if len(_worker_searches) >= 2: # forget the searches of older agents
+            _worker_searches.pop(next(iter(_worker_searches)))
+        mc = MonteCarlo(chess_board, my_pos, adv_pos, max_step, rng=np.random.default_rng(seed), **settings)
+        _worker_searches[token] = mc
+    else:
+        mc.rng = np.random.default_rng(seed)
+        if mc.batch_rollout is not None:
+            mc.batch_rollout.rng = mc.rng
+    mc.search(chess_board, my_pos, adv_pos, max_step, clock)
+    return mc.root_stats()
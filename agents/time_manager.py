@@ -0,0 +1,162 @@
+import heapq
+import time
+
+
+class TimeManager:
+    """
+    Splits the time of the agent between the moves of a game.
+
+    Each move has a hard budget, the time allowed by the rules, and a soft target
+    depending on the phase of the game: the opening and the endgame get a fraction
+    of the budget, the midgame all of it. The search can stop before the target
+    when the most visited move can no longer be overtaken, and goes on up to the
+    budget when the two best moves are too close to call.
+
+    Parameters
+    ----------
+    move_time : float
+        The budget of every move but the first one, in seconds.
+    first_move_time : float
+        The budget of the first move, in seconds.
+    first_move_factor : float
+        Fraction of the first move's budget targeted.
+    opening_factor : float
+        Fraction of the budget targeted while most of the board is still shared.
+    endgame_factor : float
+        Fraction of the budget targeted once the shared region is small.
+    clock : callable
+        Monotonic clock returning seconds.
+    """
+
+    def __init__(
+        self,
+        move_time=1.9,
+        first_move_time=29.9,
+        first_move_factor=0.5,
+        opening_factor=0.6,
+        endgame_factor=0.5,
+        clock=time.monotonic,
+    ):
+        self.move_time = move_time
+        self.first_move_time = first_move_time
+        self.first_move_factor = first_move_factor
+        self.opening_factor = opening_factor
+        self.endgame_factor = endgame_factor
+        self.clock = clock
+
+    def target(self, first_move=False, region_fraction=1.0):
+        """
+        Soft time target of a move, in seconds.
+
+        Parameters
+        ----------
+        first_move : bool
+            Whether this is the first move of the agent.
+        region_fraction : float
+            Fraction of the board in the region shared by both players.
+        """
+        if first_move:
+            return self.first_move_time * self.first_move_factor
+        if region_fraction > 0.75:
+            return self.move_time * self.opening_factor
+        if region_fraction < 0.25:
+            return self.move_time * self.endgame_factor
+        return self.move_time
+
+    def start_move(self, first_move=False, region_fraction=1.0, spent=0.0):
+        """
+        Start the clock of a move, spent seconds of which were already used elsewhere.
+
+        Returns
+        -------
+        move_clock : MoveClock
+            The clock deciding when the search of the move stops.
+        """
+        budget = self.first_move_time if first_move else self.move_time
+        return MoveClock(
+            budget,
+            self.target(first_move, region_fraction),
+            begin=self.clock() - spent,
+            clock=self.clock,
+        )
+
+
+class MoveClock:
+    """
+    Stopping rule of the search of one move, checked between batches of simulations.
+
+    The clock is only read once per batch; the size of the batches adapts to the
+    simulation rate so that a batch takes about check_time seconds.
+
+    Parameters
+    ----------
+    budget : float
+        Hard time limit of the move, in seconds.
+    target : float, optional
+        Soft time limit of the move, in seconds. Defaults to the budget.
+    begin : float, optional
+        Start of the move, on the clock. Defaults to now.
+    clock : callable
+        Monotonic clock returning seconds. Processes searching the same move share
+        the begin time, so the clock must be system-wide like time.monotonic.
+    check_time : float
+        Target duration of a batch of simulations, in seconds.
+    min_time : float
+        Minimum search time before stopping early, in seconds.
+    unstable_ratio : float
+        The search goes on past the target while the second best move has at least
+        this fraction of the visits of the best one.
+    """
+
+    def __init__(
+        self,
+        budget,
+        target=None,
+        begin=None,
+        clock=time.monotonic,
+        check_time=0.02,
+        min_time=0.1,
+        unstable_ratio=0.9,
+    ):
+        self.clock = clock
+        self.begin = clock() if begin is None else begin
+        self.deadline = self.begin + budget
+        self.target = self.begin + (budget if target is None else min(target, budget))
+        self.check_time = check_time
+        self.min_time = min_time
+        self.unstable_ratio = unstable_ratio
+        self.batch_size = 1
+
+    def elapsed(self):
+        return self.clock() - self.begin
+
+    def should_stop(self, n_sims, visits):
+        """
+        Decide whether the search stops, and update the size of the next batch.
+
+        Parameters
+        ----------
+        n_sims : int
+            The number of simulations run so far for this move.
+        visits : list of int
+            The visits of every legal move of the root, 0 for the unexpanded ones.
+        """
+        now = self.clock()
+        if now >= self.deadline:
+            return True
+        if n_sims == 0 or len(visits) < 2:
+            # a single legal move needs no search, or nothing to compare yet
+            return n_sims > 0 and len(visits) == 1
+        elapsed = now - self.begin
+        if elapsed <= 0:
+            return False
+        rate = n_sims / elapsed
+        self.batch_size = max(1, int(rate * self.check_time))
+        best, second = heapq.nlargest(2, visits)
+        if now >= self.target:
+            # too close to call, use the rest of the budget
+            return second < self.unstable_ratio * best
+        if elapsed < self.min_time:
+            return False
+        # the best move keeps the most visits whatever the remaining simulations do
+        return best - second > rate * (self.target - now)
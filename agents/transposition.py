@@ -0,0 +1,195 @@
+import sys
+import heapq
+import numpy as np
+from constants import MOVES, OPPOSITES
+
+
+class Zobrist:
+    """
+    Zobrist hashing of a game position: the walls of the board, the positions of
+    both players and the player to move.
+
+    The hash of the walls is maintained incrementally by xoring `barrier` when a
+    wall is added, and combined with the positions by `state_key`.
+
+    Parameters
+    ----------
+    board_size : int
+        The size of the board.
+    rng : numpy.random.Generator
+        The random generator used to draw the keys.
+    """
+
+    def __init__(self, board_size, rng):
+        self.board_size = board_size
+        shape = (board_size, board_size)
+        self.wall_keys = rng.integers(
+            0, 2**63, size=shape + (4,), dtype=np.int64
+        ).tolist()
+        self.my_keys = rng.integers(0, 2**63, size=shape, dtype=np.int64).tolist()
+        self.adv_keys = rng.integers(0, 2**63, size=shape, dtype=np.int64).tolist()
+        self.turn_key = int(rng.integers(0, 2**63, dtype=np.int64))
+
+    def hash_board(self, chess_board):
+        """
+        Hash of all the walls of a chess board.
+        """
+        board_hash = 0
+        for r, c, dir in np.argwhere(np.asarray(chess_board)):
+            board_hash ^= self.wall_keys[r][c][dir]
+        return board_hash
+
+    def barrier(self, r, c, dir):
+        """
+        Key of a barrier, on both sides of the wall, to xor with the hash of the board.
+        """
+        m_r, m_c = MOVES[dir]
+        return (
+            self.wall_keys[r][c][dir]
+            ^ self.wall_keys[r + m_r][c + m_c][OPPOSITES[dir]]
+        )
+
+    def state_key(self, board_hash, my_pos, adv_pos, my_turn):
+        """
+        Key of a position, given the hash of its board.
+
+        Parameters
+        ----------
+        board_hash : int
+            The hash of the walls of the board.
+        my_pos : tuple of int
+            The position of the searching agent.
+        adv_pos : tuple of int
+            The position of the adversary.
+        my_turn : bool
+            Whether the searching agent is to move.
+        """
+        key = board_hash ^ self.my_keys[my_pos[0]][my_pos[1]]
+        key ^= self.adv_keys[adv_pos[0]][adv_pos[1]]
+        if my_turn:
+            key ^= self.turn_key
+        return key
+
+
+class Entry:
+    """
+    Search statistics of a position, stored in the transposition table.
+    """
+
+    __slots__ = ("wins", "plays", "n_moves", "children", "generation")
+
+    def __init__(self, generation=0):
+        # Wins of the player who moved into this position
+        self.wins = 0
+        self.plays = 0
+        # Number of legal moves from this position, None until first visited
+        self.n_moves = None
+        # Expanded moves -> keys of the resulting positions
+        self.children = {}
+        # Last search that used this entry
+        self.generation = generation
+
+
+class TranspositionTable:
+    """
+    Bounded table of search statistics, keyed by Zobrist state keys.
+
+    When the table is full, a quarter of it is evicted: entries not used by the
+    current search go first, then the least played ones.
+
+    Parameters
+    ----------
+    capacity : int
+        The maximum number of entries.
+    """
+
+    def __init__(self, capacity=200000):
+        self.capacity = capacity
+        self.entries = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def new_search(self):
+        """
+        Start a new search, making the entries of older searches evictable first.
+        """
+        self.generation += 1
+
+    def get(self, key):
+        """
+        Look up an entry, counting hits and misses.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry.generation = self.generation
+        return entry
+
+    def peek(self, key):
+        """
+        Look up an entry without counting it in the hit rate.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry.generation = self.generation
+        return entry
+
+    def store(self, key):
+        """
+        Create a new entry for key, evicting old entries if the table is full.
+        """
+        if len(self.entries) >= self.capacity:
+            self.evict(max(1, self.capacity // 4))
+        entry = Entry(self.generation)
+        self.entries[key] = entry
+        return entry
+
+    def evict(self, n_entries):
+        """
+        Remove n_entries entries, oldest generation and least played first.
+        """
+        victims = heapq.nsmallest(
+            n_entries,
+            self.entries.items(),
+            key=lambda item: (item[1].generation, item[1].plays),
+        )
+        for key, _ in victims:
+            del self.entries[key]
+        self.evictions += len(victims)
+
+    def memory_usage(self):
+        """
+        Approximate memory used by the table, in bytes.
+        """
+        size = sys.getsizeof(self.entries)
+        for key, entry in self.entries.items():
+            size += sys.getsizeof(key) + sys.getsizeof(entry)
+            size += sys.getsizeof(entry.children)
+        return size
+
+    def stats(self):
+        """
+        Usage statistics of the table.
+
+        Returns
+        -------
+        stats : dict
+            size, capacity, hits, misses, hit_rate, evictions and memory_bytes
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_bytes": self.memory_usage(),
+        }
@@ -0,0 +1,338 @@
+from world import World, ENDGAME_BACKENDS
+import argparse
+import json
+import logging
+import platform
+import sys
+from copy import deepcopy
+from time import perf_counter
+import numpy as np
+from movegen import legal_moves
+from utils import all_logging_disabled
+
+logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+BENCHMARKS = (
+    "world_init",
+    "check_endgame",
+    "check_valid_step",
+    "set_barrier",
+    "random_walk",
+    "game",
+)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Time the hot paths of the game engine over several board sizes"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[5, 8, 12, 16, 32, 64]
+    )
+    parser.add_argument(
+        "--benchmarks", type=str, nargs="+", default=list(BENCHMARKS), choices=BENCHMARKS
+    )
+    parser.add_argument(
+        "--backends",
+        type=str,
+        nargs="+",
+        default=list(ENDGAME_BACKENDS),
+        choices=ENDGAME_BACKENDS,
+    )
+    parser.add_argument(
+        "--bitboard",
+        action="store_true",
+        default=False,
+        help="Also run every benchmark with a BitBoard chess board",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of timed rounds of every benchmark, the best one is reported",
+    )
+    parser.add_argument(
+        "--games", type=int, default=1, help="Number of games played per round by the game benchmark"
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the results to this JSON file"
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default=None,
+        help="Compare the results with those of a previous run, from its JSON file",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="With --compare, fail if a benchmark is slower by more than this fraction",
+    )
+    args = parser.parse_args()
+    return args
+
+
+class Benchmark:
+    """
+    Timings of the game engine, reproducible from a seed.
+
+    Every case (benchmark, board size, endgame backend, board representation)
+    sets up its worlds from the seed and the board size only, then times `repeat`
+    rounds of calls. The best round is reported per call, as it is the least
+    disturbed by the rest of the machine.
+
+    Parameters
+    ----------
+    seed : int
+        Seed of the worlds and inputs of every case.
+    repeat : int
+        Number of timed rounds per case.
+    games : int
+        Number of games per round of the game benchmark.
+    """
+
+    def __init__(self, seed=0, repeat=3, games=1):
+        self.seed = seed
+        self.repeat = repeat
+        self.games = games
+
+    def make_world(self, board_size, backend, bitboard, index=0, n_moves=None):
+        """
+        World of the given size, after n_moves random moves (half the usual game if None).
+        """
+        seed = np.random.SeedSequence([self.seed, board_size, index])
+        world = World(
+            board_size=board_size, endgame_backend=backend, bitboard=bitboard, seed=seed
+        )
+        if n_moves is None:
+            n_moves = board_size
+        for _ in range(n_moves):
+            is_end, _, _ = world.step()
+            if is_end:
+                break
+        return world
+
+    def time_rounds(self, setup, run):
+        """
+        Time `repeat` rounds of run(state), each with a fresh state from setup().
+
+        Returns
+        -------
+        times : list of float
+            The duration of each round, in seconds.
+        number : int
+            The number of calls per round.
+        """
+        times = []
+        number = 1
+        for _ in range(self.repeat):
+            state = setup()
+            start = perf_counter()
+            number = run(state)
+            times.append(perf_counter() - start)
+        return times, number
+
+    def world_init(self, board_size, backend, bitboard):
+        seeds = np.random.SeedSequence([self.seed, board_size]).spawn(10)
+
+        def run(_):
+            for seed in seeds:
+                World(
+                    board_size=board_size,
+                    endgame_backend=backend,
+                    bitboard=bitboard,
+                    seed=seed,
+                )
+            return len(seeds)
+
+        return self.time_rounds(lambda: None, run)
+
+    def random_barriers(self, world, board_size):
+        """
+        A world with its regions tracked, and up to 4 * board_size free walls in random order.
+        """
+        world.check_endgame()  # the incremental backend tracks regions from now on
+        rng = np.random.default_rng([self.seed, board_size])
+        board = np.asarray(world.chess_board)
+        free = np.argwhere(~board)
+        barriers = [tuple(int(x) for x in free[i]) for i in rng.permutation(len(free))]
+        return barriers[: min(len(barriers), 4 * board_size)]
+
+    def fresh_copy(self, world):
+        """
+        A copy of the world whose region tracker is rebuilt, not shared with the world.
+        """
+        copy = deepcopy(world)
+        copy.region_tracker = None
+        copy.check_endgame()
+        return copy
+
+    def check_endgame(self, board_size, backend, bitboard):
+        # each call follows a new barrier, as the incremental backend only does work then
+        world = self.make_world(board_size, backend, bitboard, n_moves=0)
+        barriers = self.random_barriers(world, board_size)
+
+        def run(copy):
+            for r, c, dir in barriers:
+                copy.set_barrier(r, c, dir)
+                copy.check_endgame()
+            return len(barriers)
+
+        return self.time_rounds(lambda: self.fresh_copy(world), run)
+
+    def check_valid_step(self, board_size, backend, bitboard):
+        world = self.make_world(board_size, backend, bitboard)
+        _, cur_pos, adv_pos = world.get_current_player()
+        moves = legal_moves(world.chess_board, cur_pos, adv_pos, world.max_step)
+        # every legal move, and as many moves to random cells, mostly out of reach
+        rng = np.random.default_rng([self.seed, board_size])
+        steps = [(np.asarray(pos), dir) for pos, dir in moves]
+        steps += [
+            (rng.integers(0, board_size, size=2), int(rng.integers(0, 4)))
+            for _ in range(len(moves))
+        ]
+
+        def run(_):
+            for end_pos, dir in steps:
+                world.check_valid_step(cur_pos, end_pos, dir)
+            return len(steps)
+
+        return self.time_rounds(lambda: None, run)
+
+    def set_barrier(self, board_size, backend, bitboard):
+        world = self.make_world(board_size, backend, bitboard, n_moves=0)
+        barriers = self.random_barriers(world, board_size)
+
+        def run(copy):
+            for r, c, dir in barriers:
+                copy.set_barrier(r, c, dir)
+            return len(barriers)
+
+        return self.time_rounds(lambda: self.fresh_copy(world), run)
+
+    def random_walk(self, board_size, backend, bitboard):
+        world = self.make_world(board_size, backend, bitboard)
+        _, cur_pos, adv_pos = world.get_current_player()
+        cur_pos, adv_pos = tuple(cur_pos), tuple(adv_pos)
+
+        def setup():
+            world.rng = np.random.default_rng([self.seed, board_size])
+
+        def run(_):
+            for _ in range(100):
+                world.random_walk(cur_pos, adv_pos)
+            return 100
+
+        return self.time_rounds(setup, run)
+
+    def game(self, board_size, backend, bitboard):
+        def run(_):
+            for index in range(self.games):
+                self.make_world(board_size, backend, bitboard, index, n_moves=10**9)
+            return self.games
+
+        return self.time_rounds(lambda: None, run)
+
+    def run_case(self, name, board_size, backend, bitboard):
+        """
+        Run one case.
+
+        Returns
+        -------
+        result : dict
+            The case, the number of calls per round, and the best and median time
+            per call in seconds.
+        """
+        with all_logging_disabled():
+            times, number = getattr(self, name)(board_size, backend, bitboard)
+        times = np.asarray(times) / number
+        return {
+            "name": name,
+            "board_size": board_size,
+            "backend": backend,
+            "bitboard": bitboard,
+            "number": number,
+            "best": float(times.min()),
+            "median": float(np.median(times)),
+        }
+
+
+def case_key(result):
+    return (result["name"], result["board_size"], result["backend"], result["bitboard"])
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with those of a baseline run.
+
+    Returns
+    -------
+    regressions : list of (dict, float)
+        The results slower than the baseline by more than tolerance, with their
+        ratio to the baseline.
+    """
+    previous = {case_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get(case_key(result))
+        if base is None or base["best"] <= 0:
+            continue
+        ratio = result["best"] / base["best"]
+        result["baseline"] = base["best"]
+        result["ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append((result, ratio))
+    return regressions
+
+
+def main(args):
+    benchmark = Benchmark(seed=args.seed, repeat=args.repeat, games=args.games)
+    results = []
+    for name in args.benchmarks:
+        for board_size in args.sizes:
+            for backend in args.backends:
+                for bitboard in (False, True) if args.bitboard else (False,):
+                    result = benchmark.run_case(name, board_size, backend, bitboard)
+                    results.append(result)
+                    logger.info(
+                        f"{name:<17} size={board_size:<3} {backend:<11} "
+                        f"{'bitboard' if bitboard else 'ndarray ':<8} "
+                        f"{result['best'] * 1e6:12.1f} us/call"
+                    )
+
+    regressions = []
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for result, ratio in regressions:
+            logger.warning(
+                f"Regression: {result['name']} size={result['board_size']} {result['backend']} "
+                f"bitboard={result['bitboard']} is {ratio:.2f}x slower"
+            )
+
+    if args.output is not None:
+        report = {
+            "meta": {
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "games": args.games,
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return regressions
+
+
+if __name__ == "__main__":
+    args = get_args()
+    regressions = main(args)
+    sys.exit(1 if regressions else 0)
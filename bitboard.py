@@ -0,0 +1,217 @@
+import numpy as np
+from constants import MOVES, OPPOSITES
+
+
+def popcount(mask):
+    """
+    Number of cells in a bit mask.
+    """
+    return bin(mask).count("1")
+
+
+class BitBoard:
+    """
+    Compact chess board storing one Python int per wall direction.
+
+    Bit (r * board_size + c) of walls[dir] is set when cell (r, c) has a barrier in
+    direction dir, with directions ordered as in the (board_size, board_size, 4) ndarray
+    used by World. The board supports the same `board[r, c, dir]` indexing as the ndarray,
+    so agents can read it without knowing the representation. Copies only duplicate the
+    list of four ints, which are immutable.
+
+    As in the game, the borders of the board are expected to be walls: reachability and
+    region operations rely on them to stop at the edges.
+    """
+
+    __slots__ = ("board_size", "walls", "full_mask")
+
+    def __init__(self, board_size, walls=None):
+        self.board_size = board_size
+        self.full_mask = (1 << (board_size * board_size)) - 1
+        if walls is None:
+            walls = [0, 0, 0, 0]
+            for i in range(board_size):
+                walls[0] |= self.cell_bit((0, i))
+                walls[1] |= self.cell_bit((i, board_size - 1))
+                walls[2] |= self.cell_bit((board_size - 1, i))
+                walls[3] |= self.cell_bit((i, 0))
+        self.walls = list(walls)
+
+    @classmethod
+    def from_array(cls, chess_board):
+        """
+        Build a bitboard from a chess board of shape (board_size, board_size, 4).
+        """
+        chess_board = np.asarray(chess_board, dtype=bool)
+        walls = [
+            int.from_bytes(
+                np.packbits(chess_board[:, :, dir].ravel(), bitorder="little").tobytes(),
+                "little",
+            )
+            for dir in range(4)
+        ]
+        return cls(chess_board.shape[0], walls)
+
+    def to_array(self):
+        """
+        Convert the bitboard to a chess board of shape (board_size, board_size, 4).
+        """
+        n_cells = self.board_size * self.board_size
+        n_bytes = (n_cells + 7) // 8
+        chess_board = np.empty((self.board_size, self.board_size, 4), dtype=bool)
+        for dir, wall in enumerate(self.walls):
+            bits = np.unpackbits(
+                np.frombuffer(wall.to_bytes(n_bytes, "little"), dtype=np.uint8),
+                bitorder="little",
+            )
+            chess_board[:, :, dir] = bits[:n_cells].reshape(
+                self.board_size, self.board_size
+            )
+        return chess_board
+
+    def __array__(self, dtype=None, copy=None):
+        chess_board = self.to_array()
+        return chess_board if dtype is None else chess_board.astype(dtype)
+
+    @property
+    def shape(self):
+        return (self.board_size, self.board_size, 4)
+
+    def copy(self):
+        return BitBoard(self.board_size, self.walls)
+
+    def readonly_view(self):
+        """
+        Read-only snapshot of the board. Copies of it are regular, writeable bitboards.
+        """
+        return FrozenBitBoard(self.board_size, self.walls)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __eq__(self, other):
+        if not isinstance(other, BitBoard):
+            return NotImplemented
+        return self.board_size == other.board_size and self.walls == other.walls
+
+    def key(self):
+        """
+        Hashable key of the walls of the board.
+        """
+        return tuple(self.walls)
+
+    def __getitem__(self, key):
+        r, c, dir = key
+        return bool(self.walls[dir] >> (int(r) * self.board_size + int(c)) & 1)
+
+    def __setitem__(self, key, value):
+        r, c, dir = key
+        bit = self.cell_bit((r, c))
+        if value:
+            self.walls[dir] |= bit
+        else:
+            self.walls[dir] &= ~bit
+
+    def set_barrier(self, r, c, dir):
+        """
+        Put a barrier on both sides of the wall in direction dir of cell (r, c).
+        """
+        r, c = int(r), int(c)
+        m_r, m_c = MOVES[dir]
+        self.walls[dir] |= 1 << (r * self.board_size + c)
+        self.walls[OPPOSITES[dir]] |= 1 << ((r + m_r) * self.board_size + c + m_c)
+
+    def cell_bit(self, pos):
+        r, c = pos
+        return 1 << (int(r) * self.board_size + int(c))
+
+    def cells(self, mask):
+        """
+        Iterate over the positions of the cells in a bit mask.
+        """
+        while mask:
+            low = mask & -mask
+            index = low.bit_length() - 1
+            yield divmod(index, self.board_size)
+            mask ^= low
+
+    def expand(self, mask):
+        """
+        Cells reachable in one step from the cells in mask, ignoring the adversary.
+        """
+        up, right, down, left = self.walls
+        board_size = self.board_size
+        return (
+            ((mask & ~up) >> board_size)
+            | ((mask & ~right) << 1)
+            | ((mask & ~down) << board_size)
+            | ((mask & ~left) >> 1)
+        ) & self.full_mask
+
+    def reachable(self, my_pos, adv_pos, max_step):
+        """
+        Cells reachable from my_pos within max_step steps without crossing the adversary.
+
+        Returns
+        -------
+        mask : int
+            Bit mask of the reachable cells, including my_pos.
+        """
+        reach = self.cell_bit(my_pos)
+        blocked = self.cell_bit(adv_pos)
+        frontier = reach
+        for _ in range(max_step):
+            frontier = self.expand(frontier) & ~reach & ~blocked
+            if not frontier:
+                break
+            reach |= frontier
+        return reach
+
+    def region(self, pos):
+        """
+        Bit mask of the connected region containing pos.
+        """
+        region = self.cell_bit(pos)
+        frontier = region
+        while frontier:
+            frontier = self.expand(frontier) & ~region
+            region |= frontier
+        return region
+
+    def region_scores(self, p0_pos, p1_pos):
+        """
+        Compute the sizes of the regions of both players.
+
+        Returns
+        -------
+        connected : bool
+            Whether both players are in the same region.
+        p0_score : int
+            The size of the region of player 1.
+        p1_score : int
+            The size of the region of player 2.
+        """
+        p0_region = self.region(p0_pos)
+        if p0_region & self.cell_bit(p1_pos):
+            size = popcount(p0_region)
+            return True, size, size
+        return False, popcount(p0_region), popcount(self.region(p1_pos))
+
+
+class FrozenBitBoard(BitBoard):
+    """
+    Read-only BitBoard, raising ValueError on any attempt to put a barrier.
+    """
+
+    __slots__ = ()
+
+    def __setitem__(self, key, value):
+        raise ValueError(
+            "The chess board is read-only. Copy it before modifying it, or set mutable_board = True in the agent."
+        )
+
+    def set_barrier(self, r, c, dir):
+        self[r, c, dir] = True
@@ -0,0 +1,119 @@
+from functools import lru_cache
+import numpy as np
+from connectivity import label_regions, split_search
+from constants import MOVES, OPPOSITES
+
+# Up to this size, a search between the start cells is cheaper than labelling the board
+SEARCH_MAX_SIZE = 12
+
+
+def empty_board(board_size):
+    """
+    Chess board with only its borders.
+
+    Returns
+    -------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+    """
+    chess_board = np.zeros((board_size, board_size, 4), dtype=bool)
+    chess_board[0, :, 0] = True
+    chess_board[:, 0, 3] = True
+    chess_board[-1, :, 2] = True
+    chess_board[:, -1, 1] = True
+    return chess_board
+
+
+@lru_cache(maxsize=None)
+def symmetric_walls(board_size):
+    """
+    Inner walls of a board, grouped by the central symmetry of the board.
+
+    Every wall is given once, as the down (2) or right (1) wall of a cell. A wall
+    and its mirror image form an orbit. No wall is its own mirror image, so every
+    orbit has two distinct walls.
+
+    Returns
+    -------
+    walls : numpy.ndarray of shape (n_orbits, 2, 3)
+        The (r, c, dir) of the two walls of each orbit.
+    """
+    n = board_size
+    r, c = np.meshgrid(np.arange(n - 1), np.arange(n), indexing="ij")
+    down = np.stack([r.ravel(), c.ravel(), np.full(r.size, 2)], axis=1)
+    down_mirror = np.stack([n - 2 - r.ravel(), n - 1 - c.ravel(), np.full(r.size, 2)], axis=1)
+    right = down[:, [1, 0, 2]].copy()
+    right[:, 2] = 1
+    right_mirror = down_mirror[:, [1, 0, 2]].copy()
+    right_mirror[:, 2] = 1
+    walls = np.stack(
+        [np.concatenate([down, right]), np.concatenate([down_mirror, right_mirror])], axis=1
+    )
+    # keep each orbit once, from its smallest wall
+    keys = walls[:, :, 2] * n * n + walls[:, :, 0] * n + walls[:, :, 1]
+    walls = walls[keys[:, 0] <= keys[:, 1]]
+    walls.flags.writeable = False
+    return walls
+
+
+def random_board(board_size, rng, n_barriers=None):
+    """
+    Draw the initial board of a game and the start positions of the players.
+
+    The board gets n_barriers random orbits of symmetric walls, drawn at once
+    uniformly without replacement (as if walls were drawn one by one with their
+    mirror image). The players start on mirror cells, uniformly among the cells
+    connected to their mirror image, so the game never starts already over: a
+    first draw among all the cells is kept if it is connected, otherwise the start
+    is drawn again among the connected cells. Only in the rare case where the
+    walls cut the board in two mirror halves are they drawn again.
+
+    Parameters
+    ----------
+    board_size : int
+        The size of the board.
+    rng : numpy.random.Generator
+        The random generator of the board.
+    n_barriers : int, optional
+        The number of symmetric barriers, (board_size + 1) // 2 by default.
+
+    Returns
+    -------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+        The chess board.
+    p0_pos, p1_pos : numpy.ndarray of shape (2,)
+        The start positions of the players.
+    """
+    if n_barriers is None:
+        n_barriers = (board_size + 1) // 2
+    walls = symmetric_walls(board_size)
+    moves = np.asarray(MOVES)
+    opposites = np.array([OPPOSITES[dir] for dir in range(4)])
+    n_cells = board_size * board_size
+    cells = np.arange(n_cells)
+    # the mirror image of the cell of flat index i has the index n_cells - 1 - i
+    starts = cells[cells != cells[::-1]]
+    while True:
+        chess_board = empty_board(board_size)
+        # the smallest uniform keys are a uniform draw without replacement
+        keys = rng.random(len(walls))
+        orbits = np.argpartition(keys, n_barriers - 1)[:n_barriers]
+        r, c, dir = walls[orbits].reshape(-1, 3).T
+        chess_board[r, c, dir] = True
+        chess_board[r + moves[dir, 0], c + moves[dir, 1], opposites[dir]] = True
+        start = int(rng.choice(starts))
+        if board_size <= SEARCH_MAX_SIZE:
+            p0_pos = divmod(start, board_size)
+            p1_pos = (board_size - 1 - p0_pos[0], board_size - 1 - p0_pos[1])
+            if split_search(chess_board, p0_pos, p1_pos) is None:
+                break
+            labels = label_regions(chess_board).ravel()
+        else:
+            labels = label_regions(chess_board).ravel()
+            if labels[start] == labels[n_cells - 1 - start]:
+                break
+        connected = starts[labels[starts] == labels[n_cells - 1 - starts]]
+        if len(connected):
+            start = int(rng.choice(connected))
+            break
+    p0_pos = np.array(divmod(start, board_size))
+    return chess_board, p0_pos, board_size - 1 - p0_pos
@@ -0,0 +1,255 @@
+from collections import deque
+import numpy as np
+from constants import MOVES
+
+
+def split_search(chess_board, pos_a, pos_b):
+    """
+    Check whether two cells are still connected, searching from both of them at once.
+    The search stops as soon as the two sides meet or one of them runs out of cells,
+    so its cost is bounded by the size of the smaller side.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+        The chess board.
+    pos_a : tuple of int
+        The first cell.
+    pos_b : tuple of int
+        The second cell.
+
+    Returns
+    -------
+    side : set of tuple or None
+        None if the two cells are connected, otherwise the cells of the side
+        that was fully explored first.
+    """
+    if pos_a == pos_b:
+        return None
+    queues = (deque([pos_a]), deque([pos_b]))
+    visited = ({pos_a}, {pos_b})
+    while True:
+        for side in (0, 1):
+            queue = queues[side]
+            seen = visited[side]
+            other = visited[1 - side]
+            if not queue:
+                return seen
+            r, c = queue.popleft()
+            for dir, (m_r, m_c) in enumerate(MOVES):
+                if chess_board[r, c, dir]:
+                    continue
+                next_pos = (r + m_r, c + m_c)
+                if next_pos in other:
+                    return None
+                if next_pos not in seen:
+                    seen.add(next_pos)
+                    queue.append(next_pos)
+
+
+def check_separation(chess_board, r, c, dir, my_pos, adv_pos, region_size):
+    """
+    Check whether the barrier just put at (r, c, dir) by the player at my_pos ended
+    the game, searching from both sides of the wall instead of the whole board.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+        The chess board, with the new barrier.
+    r, c, dir : int
+        The new barrier.
+    my_pos : tuple of int
+        The position of the player who put the barrier.
+    adv_pos : tuple of int
+        The position of its adversary.
+    region_size : int
+        The size of the region shared by both players before the barrier.
+
+    Returns
+    -------
+    is_endgame : bool
+        Whether the game ends.
+    score : int
+        1 if the player at my_pos wins, -1 if it loses, 0 on a tie or if the game goes on.
+    region_size : int
+        The size of the region shared by the players if the game goes on.
+    """
+    m_r, m_c = MOVES[dir]
+    side = split_search(chess_board, (r, c), (r + m_r, c + m_c))
+    if side is None:  # the wall did not split the region
+        return False, 0, region_size
+    my_side = tuple(my_pos) in side
+    if my_side == (tuple(adv_pos) in side):
+        # both players are on the same side, the other side is out of the game
+        return False, 0, len(side) if my_side else region_size - len(side)
+    my_score = len(side) if my_side else region_size - len(side)
+    adv_score = region_size - my_score
+    if my_score == adv_score:
+        return True, 0, region_size
+    return True, 1 if my_score > adv_score else -1, region_size
+
+
+class RegionTracker:
+    """
+    Incremental labelling of the connected regions of a chess board.
+
+    The regions are computed once, then updated by `add_barrier` every time a
+    barrier is put on the board. Only a barrier that actually splits a region
+    triggers a relabelling, and only the smaller side of the split is relabelled.
+    Writing to the board without calling `add_barrier` leaves the tracker stale.
+    """
+
+    def __init__(self, chess_board):
+        self.chess_board = chess_board
+        self.board_size = chess_board.shape[0]
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Label every region of the board from scratch.
+        """
+        board_size = self.board_size
+        self.labels = [[-1] * board_size for _ in range(board_size)]
+        self.sizes = {}
+        self.next_label = 0
+        for r in range(board_size):
+            for c in range(board_size):
+                if self.labels[r][c] < 0:
+                    self.fill((r, c), self.next_label)
+                    self.next_label += 1
+
+    def fill(self, start_pos, label):
+        """
+        Flood fill the region containing start_pos with the given label.
+        """
+        r, c = start_pos
+        self.labels[r][c] = label
+        state_queue = deque([start_pos])
+        size = 0
+        while state_queue:
+            r, c = state_queue.popleft()
+            size += 1
+            for dir, (m_r, m_c) in enumerate(MOVES):
+                if self.chess_board[r, c, dir]:
+                    continue
+                n_r, n_c = r + m_r, c + m_c
+                if self.labels[n_r][n_c] != label:
+                    self.labels[n_r][n_c] = label
+                    state_queue.append((n_r, n_c))
+        self.sizes[label] = size
+
+    def add_barrier(self, r, c, dir):
+        """
+        Update the regions after a barrier has been put on the board.
+
+        Parameters
+        ----------
+        r, c : int
+            The cell the barrier was put on.
+        dir : int
+            The direction of the barrier.
+        """
+        m_r, m_c = MOVES[dir]
+        pos_a = (r, c)
+        pos_b = (r + m_r, c + m_c)
+        label = self.labels[r][c]
+        if label != self.labels[pos_b[0]][pos_b[1]]:
+            # Already in different regions
+            return
+        side = split_search(self.chess_board, pos_a, pos_b)
+        if side is None:
+            return
+        new_label = self.next_label
+        self.next_label += 1
+        for s_r, s_c in side:
+            self.labels[s_r][s_c] = new_label
+        self.sizes[new_label] = len(side)
+        self.sizes[label] -= len(side)
+
+    def label(self, pos):
+        r, c = pos
+        return self.labels[r][c]
+
+    def region_size(self, pos):
+        return self.sizes[self.label(pos)]
+
+    def connected(self, pos_a, pos_b):
+        return self.label(pos_a) == self.label(pos_b)
+
+
+def label_regions(chess_board):
+    """
+    Label the connected regions of one or several chess boards with array operations.
+    Each cell takes the smallest flat index among the cells it is connected to,
+    propagated through the open right/down walls and shortened by pointer jumping.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (..., board_size, board_size, 4)
+        The chess board(s).
+
+    Returns
+    -------
+    labels : numpy.ndarray of shape (..., board_size, board_size)
+        The flat index (r * board_size + c) of the representative cell of each region.
+    """
+    chess_board = np.asarray(chess_board, dtype=bool)
+    board_size = chess_board.shape[-2]
+    batch_shape = chess_board.shape[:-3]
+    n_cells = board_size * board_size
+    open_right = ~chess_board[..., :, :-1, 1]
+    open_down = ~chess_board[..., :-1, :, 2]
+    labels = np.broadcast_to(
+        np.arange(n_cells, dtype=np.int64).reshape(board_size, board_size),
+        batch_shape + (board_size, board_size),
+    ).copy()
+    flat_shape = batch_shape + (n_cells,)
+    while True:
+        new_labels = labels.copy()
+        # Propagate through right/left and down/up walls
+        np.minimum(
+            new_labels[..., :, :-1],
+            np.where(open_right, labels[..., :, 1:], n_cells),
+            out=new_labels[..., :, :-1],
+        )
+        np.minimum(
+            new_labels[..., :, 1:],
+            np.where(open_right, labels[..., :, :-1], n_cells),
+            out=new_labels[..., :, 1:],
+        )
+        np.minimum(
+            new_labels[..., :-1, :],
+            np.where(open_down, labels[..., 1:, :], n_cells),
+            out=new_labels[..., :-1, :],
+        )
+        np.minimum(
+            new_labels[..., 1:, :],
+            np.where(open_down, labels[..., :-1, :], n_cells),
+            out=new_labels[..., 1:, :],
+        )
+        # Pointer jumping: take the label of the representative cell
+        flat = new_labels.reshape(flat_shape)
+        new_labels = np.take_along_axis(flat, flat, axis=-1).reshape(labels.shape)
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+def region_scores(chess_board, p0_pos, p1_pos):
+    """
+    Compute the sizes of the regions of both players on a chess board using `label_regions`.
+
+    Returns
+    -------
+    connected : bool
+        Whether both players are in the same region.
+    p0_score : int
+        The size of the region of player 1.
+    p1_score : int
+        The size of the region of player 2.
+    """
+    labels = label_regions(chess_board)
+    sizes = np.bincount(labels.ravel(), minlength=labels.size)
+    p0_label = labels[p0_pos[0], p0_pos[1]]
+    p1_label = labels[p1_pos[0], p1_pos[1]]
+    return bool(p0_label == p1_label), int(sizes[p0_label]), int(sizes[p1_label])
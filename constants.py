@@ -1,6 +1,8 @@
 # Constants used throughout the game
 MIN_BOARD_SIZE = 5
 MAX_BOARD_SIZE = 10
+# Backends used by World.check_endgame to find the connected regions
+ENDGAME_BACKENDS = ("incremental", "vectorized")
 AGENT_NOT_FOUND_MSG = (
     "Check if you have used the decorator @register_agent to register your agent!"
 )
@@ -18,3 +20,7 @@ PLAYER_1_NAME = "A"
 PLAYER_2_NAME = "B"
 PLAYER_1_COLOR = "tab:blue"
 PLAYER_2_COLOR = "tab:brown"
+# Moves (Up, Right, Down, Left), indexed by direction
+MOVES = ((-1, 0), (0, 1), (1, 0), (0, -1))
+# Opposite direction of each direction
+OPPOSITES = {0: 2, 1: 3, 2: 0, 3: 1}
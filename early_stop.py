@@ -0,0 +1,137 @@
+from math import log, sqrt
+from statistics import NormalDist
+
+EARLY_STOP_MODES = ("none", "sprt", "ci")
+
+# Decisions of the early stopping rules
+H0, H1 = "H0", "H1"
+
+
+def wilson_interval(score, n, confidence=0.95):
+    """
+    Wilson score interval of a win rate.
+
+    Parameters
+    ----------
+    score : float
+        The number of wins, ties may count as half a win.
+    n : int
+        The number of games.
+    confidence : float
+        The confidence level of the interval.
+
+    Returns
+    -------
+    low, high : float
+        The bounds of the interval, (0, 1) if no game was played.
+    """
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = score / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half_width = z * sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def elo_to_score(elo):
+    """
+    Expected score of a player with an Elo advantage of elo.
+    """
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+class SPRT:
+    """
+    Sequential probability ratio test between two Elo differences of player 1.
+
+    Games score 1, 0.5 or 0 for player 1. After each game, the log likelihood
+    ratio of H1 (the difference is elo1) against H0 (it is elo0) is compared to
+    the bounds set by the error rates alpha and beta; the test stops as soon as
+    one is crossed. The likelihoods use the normal approximation of the mean
+    score, whose variance is estimated with half a virtual game of each outcome
+    so that a run of wins does not have a zero variance.
+
+    Parameters
+    ----------
+    elo0, elo1 : float
+        The Elo differences of H0 and H1.
+    alpha : float
+        The probability of accepting H1 when H0 holds.
+    beta : float
+        The probability of accepting H0 when H1 holds.
+    """
+
+    def __init__(self, elo0=0.0, elo1=50.0, alpha=0.05, beta=0.05):
+        self.score0 = elo_to_score(elo0)
+        self.score1 = elo_to_score(elo1)
+        self.lower = log(beta / (1 - alpha))
+        self.upper = log((1 - beta) / alpha)
+        self.counts = [0, 0, 0]  # losses, ties and wins of player 1
+
+    def add(self, score):
+        self.counts[int(2 * score)] += 1
+
+    @property
+    def n(self):
+        return sum(self.counts)
+
+    @property
+    def score(self):
+        return self.counts[2] + self.counts[1] / 2
+
+    def llr(self):
+        """
+        Log likelihood ratio of H1 against H0.
+        """
+        counts = [count + 0.5 for count in self.counts]
+        total = sum(counts)
+        mean = (counts[1] / 2 + counts[2]) / total
+        variance = (counts[1] / 4 + counts[2]) / total - mean * mean
+        return (
+            (self.score1 - self.score0)
+            * (2 * self.score - self.n * (self.score0 + self.score1))
+            / (2 * variance)
+        )
+
+    def decision(self):
+        """
+        H1 or H0 once the test is settled, None before.
+        """
+        llr = self.llr()
+        if llr >= self.upper:
+            return H1
+        if llr <= self.lower:
+            return H0
+        return None
+
+
+class ConfidenceStop:
+    """
+    Stop once the Wilson interval of the score of player 1 excludes an even match.
+
+    Parameters
+    ----------
+    confidence : float
+        The confidence level of the interval.
+    """
+
+    def __init__(self, confidence=0.95):
+        self.confidence = confidence
+        self.n = 0
+        self.score = 0.0
+
+    def add(self, score):
+        self.n += 1
+        self.score += score
+
+    def decision(self):
+        """
+        H1 if player 1 is stronger, H0 if it is weaker, None while it is unsettled.
+        """
+        low, high = wilson_interval(self.score, self.n, self.confidence)
+        if low > 0.5:
+            return H1
+        if high < 0.5:
+            return H0
+        return None
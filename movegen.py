@@ -0,0 +1,97 @@
+from collections import deque
+from bitboard import BitBoard
+from constants import MOVES
+
+
+def iter_reachable(chess_board, my_pos, adv_pos, max_step):
+    """
+    Iterate over the cells reachable from my_pos within max_step steps, in BFS order.
+    The adversary blocks its cell, and my_pos itself comes first.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4) or BitBoard
+        The chess board.
+    my_pos : tuple of int
+        The position of the agent.
+    adv_pos : tuple of int
+        The position of the adversary.
+    max_step : int
+        The maximum number of steps that the agent can take.
+    """
+    my_pos = (int(my_pos[0]), int(my_pos[1]))
+    adv_pos = (int(adv_pos[0]), int(adv_pos[1]))
+    if isinstance(chess_board, BitBoard):
+        # Bit-parallel BFS, the order within a layer follows the bit order
+        yield my_pos
+        reach = chess_board.cell_bit(my_pos)
+        blocked = chess_board.cell_bit(adv_pos)
+        frontier = reach
+        for _ in range(max_step):
+            frontier = chess_board.expand(frontier) & ~reach & ~blocked
+            if not frontier:
+                return
+            reach |= frontier
+            yield from chess_board.cells(frontier)
+        return
+
+    yield my_pos
+    state_queue = deque([(my_pos, 0)])
+    visited = {my_pos, adv_pos}
+    while state_queue:
+        (r, c), cur_step = state_queue.popleft()
+        if cur_step == max_step:
+            break
+        for dir, (m_r, m_c) in enumerate(MOVES):
+            if chess_board[r, c, dir]:
+                continue
+            next_pos = (r + m_r, c + m_c)
+            if next_pos in visited:
+                continue
+            visited.add(next_pos)
+            yield next_pos
+            state_queue.append((next_pos, cur_step + 1))
+
+
+def reachable_cells(chess_board, my_pos, adv_pos, max_step):
+    """
+    List of the cells reachable from my_pos within max_step steps, in BFS order.
+    """
+    return list(iter_reachable(chess_board, my_pos, adv_pos, max_step))
+
+
+def is_reachable(chess_board, my_pos, end_pos, adv_pos, max_step):
+    """
+    Check whether end_pos is reachable from my_pos within max_step steps.
+    The search stops as soon as end_pos is found.
+    """
+    end_pos = (int(end_pos[0]), int(end_pos[1]))
+    for pos in iter_reachable(chess_board, my_pos, adv_pos, max_step):
+        if pos == end_pos:
+            return True
+    return False
+
+
+def valid_barriers(chess_board, pos):
+    """
+    List of the directions where a barrier can be put on the cell pos.
+    """
+    r, c = pos
+    return [dir for dir in range(4) if not chess_board[r, c, dir]]
+
+
+def legal_moves(chess_board, my_pos, adv_pos, max_step):
+    """
+    Enumerate every legal move with a single bounded BFS.
+
+    Returns
+    -------
+    moves : list of ((int, int), int)
+        All the (position, barrier direction) pairs the agent can play,
+        ordered by distance from my_pos and then by direction.
+    """
+    return [
+        (pos, dir)
+        for pos in iter_reachable(chess_board, my_pos, adv_pos, max_step)
+        for dir in valid_barriers(chess_board, pos)
+    ]
@@ -0,0 +1,100 @@
+import base64
+import json
+import numpy as np
+
+
+class GameRecord:
+    """
+    Compact record of a game: the initial board, the start positions, the seed
+    and every move played as (pos, dir, think_time).
+
+    Records are stored one per line as JSON, with the board packed to bits.
+    """
+
+    def __init__(
+        self, chess_board, p0_pos, p1_pos, seed=None, players=None, moves=None, scores=None
+    ):
+        self.chess_board = np.array(chess_board, dtype=bool)
+        self.p0_pos = (int(p0_pos[0]), int(p0_pos[1]))
+        self.p1_pos = (int(p1_pos[0]), int(p1_pos[1]))
+        self.seed = seed
+        self.players = players
+        self.moves = [] if moves is None else moves
+        self.scores = scores
+
+    @property
+    def board_size(self):
+        return self.chess_board.shape[0]
+
+    def add_move(self, pos, dir, think_time):
+        """
+        Record a move, in turn order starting with player 1.
+        """
+        self.moves.append((int(pos[0]), int(pos[1]), int(dir), float(think_time)))
+
+    def to_dict(self):
+        seed = self.seed
+        if isinstance(seed, np.random.SeedSequence):
+            seed = {"entropy": seed.entropy, "spawn_key": list(seed.spawn_key)}
+        return {
+            "board_size": self.board_size,
+            "board": base64.b64encode(np.packbits(self.chess_board).tobytes()).decode(),
+            "p0_pos": self.p0_pos,
+            "p1_pos": self.p1_pos,
+            "seed": seed,
+            "players": self.players,
+            "moves": self.moves,
+            "scores": self.scores,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        board_size = data["board_size"]
+        bits = np.unpackbits(
+            np.frombuffer(base64.b64decode(data["board"]), dtype=np.uint8)
+        )
+        chess_board = bits[: board_size * board_size * 4].reshape(
+            board_size, board_size, 4
+        )
+        seed = data.get("seed")
+        if isinstance(seed, dict):
+            entropy = seed["entropy"]
+            seed = np.random.SeedSequence(
+                tuple(entropy) if isinstance(entropy, list) else entropy,
+                spawn_key=tuple(seed["spawn_key"]),
+            )
+        return cls(
+            chess_board,
+            data["p0_pos"],
+            data["p1_pos"],
+            seed=seed,
+            players=data.get("players"),
+            moves=[tuple(move) for move in data["moves"]],
+            scores=data.get("scores"),
+        )
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, line):
+        return cls.from_dict(json.loads(line))
+
+
+def write_records(path, records):
+    """
+    Append game records to a JSONL file.
+    """
+    with open(path, "a") as f:
+        for record in records:
+            f.write(record.to_json() + "\n")
+
+
+def read_records(path):
+    """
+    Stream the game records of a JSONL file, one at a time.
+    """
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield GameRecord.from_json(line)
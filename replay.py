@@ -0,0 +1,117 @@
+import numpy as np
+from world import World
+from record import read_records
+from constants import *
+
+
+class ReplayWorld(World):
+    """
+    World rebuilt from a game record, without agents nor UI.
+    Moves are applied with apply_move, using the same set_barrier and check_endgame as World.
+    """
+
+    def __init__(self, record, endgame_backend="incremental", bitboard=False):
+        super().__init__(
+            player_1=None,
+            player_2=None,
+            endgame_backend=endgame_backend,
+            bitboard=bitboard,
+            seed=record.seed,
+            initial_board=(record.chess_board, record.p0_pos, record.p1_pos),
+        )
+
+    def apply_move(self, pos, dir, validate=False):
+        """
+        Play a recorded move for the current player.
+
+        Parameters
+        ----------
+        pos : tuple of int
+            The end position of the move
+        dir : int
+            The direction of the barrier
+        validate : bool
+            Whether to check that the move is valid
+
+        Returns
+        -------
+        results: tuple
+            The results of the move containing (is_endgame, player_1_score, player_2_score)
+        """
+        _, cur_pos, _ = self.get_current_player()
+        next_pos = np.asarray(pos, dtype=cur_pos.dtype)
+        if validate and not self.check_valid_step(cur_pos, next_pos, dir):
+            raise ValueError(
+                "Not a valid step from {} to {} and put barrier at {}, with max steps = {}".format(
+                    cur_pos, next_pos, dir, self.max_step
+                )
+            )
+        if not self.turn:
+            self.p0_pos = next_pos
+        else:
+            self.p1_pos = next_pos
+        self.set_barrier(pos[0], pos[1], dir)
+        self.turn = 1 - self.turn
+        return self.check_endgame()
+
+
+def replay(record, validate=False, endgame_backend="incremental", bitboard=False):
+    """
+    Replay a recorded game at full speed.
+
+    Returns
+    -------
+    world : ReplayWorld
+        The world at the end of the game
+    results : tuple
+        The results after the last move containing (is_endgame, player_1_score, player_2_score)
+    """
+    world = ReplayWorld(record, endgame_backend=endgame_backend, bitboard=bitboard)
+    results = world.check_endgame()
+    for r, c, dir, _ in record.moves:
+        results = world.apply_move((r, c), dir, validate=validate)
+    return world, results
+
+
+def replay_file(path, validate=False, endgame_backend="incremental", bitboard=False):
+    """
+    Stream the records of a JSONL file and replay each of them.
+    Yields (record, results) for every game.
+    """
+    for record in read_records(path):
+        _, results = replay(
+            record,
+            validate=validate,
+            endgame_backend=endgame_backend,
+            bitboard=bitboard,
+        )
+        yield record, results
+
+
+if __name__ == "__main__":
+    import argparse
+    from time import time
+    from utils import all_logging_disabled
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("record_path", type=str)
+    parser.add_argument("--validate", action="store_true", default=False)
+    parser.add_argument(
+        "--endgame_backend", type=str, default="incremental", choices=ENDGAME_BACKENDS
+    )
+    args = parser.parse_args()
+
+    start_time = time()
+    n_games = 0
+    n_moves = 0
+    with all_logging_disabled():
+        for record, results in replay_file(
+            args.record_path,
+            validate=args.validate,
+            endgame_backend=args.endgame_backend,
+        ):
+            n_games += 1
+            n_moves += len(record.moves)
+            if record.scores is not None and tuple(record.scores) != results[1:]:
+                print(f"Game {n_games - 1}: recorded {record.scores}, replayed {results[1:]}")
+    print(f"Replayed {n_games} games ({n_moves} moves) in {time() - start_time:.3f} seconds")
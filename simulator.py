@@ -1,8 +1,13 @@
-from world import World, PLAYER_1_NAME, PLAYER_2_NAME
+from world import World, PLAYER_1_NAME, PLAYER_2_NAME, ENDGAME_BACKENDS
 import argparse
 from utils import all_logging_disabled
+from record import write_records
+from stats import write_stats
+from agents.remote_agent import RemoteAgent
+from early_stop import EARLY_STOP_MODES, H1, SPRT, ConfidenceStop, wilson_interval
 import logging
 from tqdm import tqdm
+from multiprocessing import Pool
 import numpy as np
 
 logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
@@ -33,6 +38,120 @@ def get_args():
     parser.add_argument("--display_save_path", type=str, default="plots/")
     parser.add_argument("--autoplay", action="store_true", default=False)
     parser.add_argument("--autoplay_runs", type=int, default=1000)
+    parser.add_argument(
+        "--early_stop",
+        type=str,
+        default="none",
+        choices=EARLY_STOP_MODES,
+        help="In autoplay mode, stop before --autoplay_runs games once the comparison is settled, "
+        "by a sequential probability ratio test (sprt) or when the confidence interval of the "
+        "score excludes an even match (ci)",
+    )
+    parser.add_argument(
+        "--min_games",
+        type=int,
+        default=10,
+        help="With --early_stop, the minimum number of games",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level of the intervals of the win percentages, and of --early_stop ci",
+    )
+    parser.add_argument(
+        "--sprt_elo0",
+        type=float,
+        default=0.0,
+        help="With --early_stop sprt, the Elo difference of player 1 under H0",
+    )
+    parser.add_argument(
+        "--sprt_elo1",
+        type=float,
+        default=50.0,
+        help="With --early_stop sprt, the Elo difference of player 1 under H1",
+    )
+    parser.add_argument("--sprt_alpha", type=float, default=0.05)
+    parser.add_argument("--sprt_beta", type=float, default=0.05)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed of the game, or of the whole batch in autoplay mode",
+    )
+    parser.add_argument(
+        "--replay_game",
+        type=int,
+        default=None,
+        help="Replay a single game of an autoplay batch, given its index and the --seed of the batch",
+    )
+    parser.add_argument(
+        "--record_path",
+        type=str,
+        default=None,
+        help="If set, append the record of every finished game to this JSONL file",
+    )
+    parser.add_argument(
+        "--stats_path",
+        type=str,
+        default=None,
+        help="If set, append the timings and agent metrics of every move to <stats_path>/moves.jsonl and a summary of every game to <stats_path>/games.csv",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="In autoplay mode, the number of processes playing games in parallel",
+    )
+    parser.add_argument(
+        "--endgame_backend",
+        type=str,
+        default="incremental",
+        choices=ENDGAME_BACKENDS,
+        help="How the world finds the connected regions to check the end of the game",
+    )
+    parser.add_argument(
+        "--bitboard",
+        action="store_true",
+        default=False,
+        help="Store the chess board as a BitBoard instead of a numpy array",
+    )
+    parser.add_argument(
+        "--move_time_limit",
+        type=float,
+        default=None,
+        help="If set, the seconds an agent has for each move, a late move is replaced by a random walk",
+    )
+    parser.add_argument(
+        "--first_move_time_limit",
+        type=float,
+        default=None,
+        help="If set, the time limit of the first move of each agent instead of --move_time_limit",
+    )
+    parser.add_argument(
+        "--game_time_limit",
+        type=float,
+        default=None,
+        help="If set, the seconds each agent has for all its moves in a game",
+    )
+    parser.add_argument(
+        "--remote",
+        action="store_true",
+        default=False,
+        help="Run each agent in its own worker process, reused across games",
+    )
+    parser.add_argument(
+        "--remote_max_games",
+        type=int,
+        default=None,
+        help="With --remote, restart the worker of an agent after this number of games",
+    )
+    parser.add_argument(
+        "--remote_max_rss",
+        type=int,
+        default=None,
+        help="With --remote, restart the worker of an agent at the next game once its peak memory exceeds this many megabytes",
+    )
     args = parser.parse_args()
     return args
 
@@ -48,8 +167,36 @@ class Simulator:
 
     def __init__(self, args):
         self.args = args
+        # Remote agents by player argument, kept across games
+        self.remote_agents = {}
 
-    def reset(self, swap_players=False, board_size=None):
+    def get_remote_agent(self, player):
+        """
+        Get the remote agent of a player, starting its worker on first use.
+
+        Parameters
+        ----------
+        player : str
+            "player_1" or "player_2", the argument naming the agent
+        """
+        if player not in self.remote_agents:
+            max_rss = self.args.remote_max_rss
+            self.remote_agents[player] = RemoteAgent(
+                getattr(self.args, player),
+                max_games=self.args.remote_max_games,
+                max_rss=None if max_rss is None else max_rss * 1024,
+            )
+        return self.remote_agents[player]
+
+    def close(self):
+        """
+        Stop the workers of the remote agents.
+        """
+        for agent in self.remote_agents.values():
+            agent.close()
+        self.remote_agents = {}
+
+    def reset(self, swap_players=False, board_size=None, seed=None):
         """
         Reset the game
 
@@ -59,13 +206,18 @@ class Simulator:
             if True, swap the players
         board_size : int
             if not None, set the board size
+        seed : int or numpy.random.SeedSequence
+            if not None, seed of the game
         """
         if board_size is None:
             board_size = self.args.board_size
-        if swap_players:
-            player_1, player_2 = self.args.player_2, self.args.player_1
+        if self.args.remote:
+            player_1 = self.get_remote_agent("player_1")
+            player_2 = self.get_remote_agent("player_2")
         else:
             player_1, player_2 = self.args.player_1, self.args.player_2
+        if swap_players:
+            player_1, player_2 = player_2, player_1
         self.world = World(
             player_1=player_1,
             player_2=player_2,
@@ -75,25 +227,117 @@ class Simulator:
             display_save=self.args.display_save,
             display_save_path=self.args.display_save_path,
             autoplay=self.args.autoplay,
+            endgame_backend=self.args.endgame_backend,
+            bitboard=self.args.bitboard,
+            seed=seed,
+            move_time_limit=self.args.move_time_limit,
+            first_move_time_limit=self.args.first_move_time_limit,
+            game_time_limit=self.args.game_time_limit,
+        )
+
+    def game_setup(self, index):
+        """
+        Setup of a game of an autoplay batch, derived only from its index and the seed of the batch
+
+        Parameters
+        ----------
+        index : int
+            index of the game in the batch
+
+        Returns
+        -------
+        tuple of (swap_players, board_size, seed)
+        """
+        if self.args.seed is None:
+            raise ValueError("The seed of the batch is needed to set up its games.")
+        seed = np.random.SeedSequence([self.args.seed, index])
+        board_size = int(
+            np.random.default_rng(seed).integers(
+                self.args.board_size_min, self.args.board_size_max
+            )
         )
-        if self.world.initial_end:
-            logger.warning("Initialization failed! Reset the world again!")
-            self.reset()
+        return index % 2 == 0, board_size, seed
 
-    def run(self, swap_players=False, board_size=None):
-        self.reset(swap_players=swap_players, board_size=board_size)
+    def early_stop(self):
+        """
+        The early stopping rule of autoplay mode, None if the batch is played in full.
+        """
+        mode = self.args.early_stop
+        if mode == "sprt":
+            return SPRT(
+                elo0=self.args.sprt_elo0,
+                elo1=self.args.sprt_elo1,
+                alpha=self.args.sprt_alpha,
+                beta=self.args.sprt_beta,
+            )
+        if mode == "ci":
+            return ConfidenceStop(confidence=self.args.confidence)
+        return None
+
+    def run(self, swap_players=False, board_size=None, seed=None, index=0):
+        if seed is None:
+            seed = self.args.seed
+        self.reset(swap_players=swap_players, board_size=board_size, seed=seed)
         is_end, p0_score, p1_score = self.world.step()
         while not is_end:
             is_end, p0_score, p1_score = self.world.step()
         logger.info(
             f"Run finished. Player {PLAYER_1_NAME}: {p0_score}, Player {PLAYER_2_NAME}: {p1_score}"
         )
+        if not self.args.autoplay:
+            # In autoplay mode, records and stats are written by the main process only
+            if self.args.record_path is not None:
+                write_records(self.args.record_path, [self.world.game_record])
+            if self.args.stats_path is not None:
+                write_stats(
+                    self.args.stats_path,
+                    index,
+                    self.world.move_stats,
+                    self.world.game_stats(),
+                )
         return p0_score, p1_score, self.world.p0_time, self.world.p1_time
 
+    def autoplay_run(self, index):
+        """
+        Play a game of an autoplay batch, set up from its index
+
+        Parameters
+        ----------
+        index : int
+            index of the game in the batch
+
+        Returns
+        -------
+        result : tuple of (p0_score, p1_score, p0_time, p1_time)
+        record : GameRecord
+            The record of the game
+        stats : tuple of (move_stats, game_stats)
+            The stats of every move and the summary of the game
+        """
+        swap_players, board_size, seed = self.game_setup(index)
+        result = self.run(swap_players=swap_players, board_size=board_size, seed=seed)
+        world = self.world
+        return result, world.game_record, (world.move_stats, world.game_stats())
+
     def autoplay(self):
         """
         Run multiple simulations of the gameplay and aggregate win %
+
+        With --early_stop, the games are still consumed in order of their index, so
+        the batch stops after the same games whatever the number of workers.
+
+        Returns
+        -------
+        n_games : int
+            The number of games played.
+        p1_win_count, p2_win_count : int
+            The number of wins of each player, ties count for both.
+        decision : str or None
+            H1 or H0 if the early stopping rule settled the comparison, None otherwise.
         """
+        stop = self.early_stop()
+        decision = None
+        n_games = 0
         p1_win_count = 0
         p2_win_count = 0
         p1_times = []
@@ -101,42 +345,124 @@ class Simulator:
         if self.args.display:
             logger.warning("Since running autoplay mode, display will be disabled")
         self.args.display = False
+        if self.args.seed is None:
+            self.args.seed = int(np.random.SeedSequence().entropy)
+        logger.info(
+            f"Autoplay seed: {self.args.seed}. Replay a game with --seed {self.args.seed} --replay_game <index>"
+        )
+        if self.args.remote and self.args.workers > 1:
+            raise ValueError(
+                "Remote agents run in their own processes, they need --workers 1."
+            )
+        # Every game is set up from its index only, so that it does not depend on the workers
+        jobs = [(self.args, i) for i in range(self.args.autoplay_runs)]
         with all_logging_disabled():
-            for i in tqdm(range(self.args.autoplay_runs)):
-                swap_players = i % 2 == 0
-                board_size = np.random.randint(args.board_size_min, args.board_size_max)
-                p0_score, p1_score, p0_time, p1_time = self.run(
-                    swap_players=swap_players, board_size=board_size
-                )
-                if swap_players:
-                    p0_score, p1_score, p0_time, p1_time = (
-                        p1_score,
-                        p0_score,
-                        p1_time,
-                        p0_time,
-                    )
-                if p0_score > p1_score:
-                    p1_win_count += 1
-                elif p0_score < p1_score:
-                    p2_win_count += 1
-                else:  # Tie
-                    p1_win_count += 1
-                    p2_win_count += 1
-                p1_times.append(p0_time)
-                p2_times.append(p1_time)
+            if self.args.workers > 1:
+                pool = Pool(self.args.workers)
+                results = pool.imap(autoplay_game, jobs)
+            else:
+                pool = None
+                # A single simulator plays every game, reusing its remote agents
+                results = map(self.autoplay_run, range(self.args.autoplay_runs))
+            try:
+                for i, (result, record, stats) in enumerate(
+                    tqdm(results, total=len(jobs))
+                ):
+                    swap_players, _, _ = self.game_setup(i)
+                    p0_score, p1_score, p0_time, p1_time = result
+                    if self.args.record_path is not None:
+                        write_records(self.args.record_path, [record])
+                    if self.args.stats_path is not None:
+                        write_stats(self.args.stats_path, i, *stats)
+                    if swap_players:
+                        p0_score, p1_score, p0_time, p1_time = (
+                            p1_score,
+                            p0_score,
+                            p1_time,
+                            p0_time,
+                        )
+                    if p0_score > p1_score:
+                        p1_win_count += 1
+                    elif p0_score < p1_score:
+                        p2_win_count += 1
+                    else:  # Tie
+                        p1_win_count += 1
+                        p2_win_count += 1
+                    p1_times.append(p0_time)
+                    p2_times.append(p1_time)
+                    n_games += 1
+                    if stop is not None:
+                        stop.add(np.sign(p0_score - p1_score) / 2 + 0.5)
+                        if n_games >= self.args.min_games:
+                            decision = stop.decision()
+                            if decision is not None:
+                                break
+            finally:
+                if pool is not None:
+                    pool.terminate()
+                self.close()
 
+        confidence = self.args.confidence
+        p1_low, p1_high = wilson_interval(p1_win_count, n_games, confidence)
+        p2_low, p2_high = wilson_interval(p2_win_count, n_games, confidence)
         logger.info(
-            f"Player {PLAYER_1_NAME} win percentage: {p1_win_count / self.args.autoplay_runs} ({np.round(np.mean(p1_times), 5)} seconds/game)"
+            f"Player {PLAYER_1_NAME} win percentage: {p1_win_count / n_games} [{p1_low:.3f}, {p1_high:.3f}] ({np.round(np.mean(p1_times), 5)} seconds/game)"
         )
         logger.info(
-            f"Player {PLAYER_2_NAME} win percentage: {p2_win_count / self.args.autoplay_runs}, ({np.round(np.mean(p2_times), 5)} seconds/game)"
+            f"Player {PLAYER_2_NAME} win percentage: {p2_win_count / n_games} [{p2_low:.3f}, {p2_high:.3f}], ({np.round(np.mean(p2_times), 5)} seconds/game)"
         )
+        if stop is not None:
+            if decision is None:
+                logger.info(f"Early stop: not settled after {n_games} games")
+            else:
+                stronger = PLAYER_1_NAME if decision == H1 else PLAYER_2_NAME
+                if isinstance(stop, SPRT) and decision != H1:
+                    result = f"player {PLAYER_1_NAME} is not {self.args.sprt_elo1} Elo stronger"
+                else:
+                    result = f"player {stronger} is stronger"
+                logger.info(
+                    f"Early stop after {n_games} of {self.args.autoplay_runs} games: {decision}, {result}"
+                )
+        return n_games, p1_win_count, p2_win_count, decision
+
+
+def autoplay_game(job):
+    """
+    Play a single autoplay game with a fresh simulator, possibly in a worker process.
+
+    Parameters
+    ----------
+    job : tuple
+        (args, index) of the game in the batch
+
+    Returns
+    -------
+    result : tuple of (p0_score, p1_score, p0_time, p1_time)
+    record : GameRecord
+        The record of the game
+    stats : tuple of (move_stats, game_stats)
+        The stats of every move and the summary of the game
+    """
+    args, index = job
+    with all_logging_disabled():
+        return Simulator(args).autoplay_run(index)
 
 
 if __name__ == "__main__":
     args = get_args()
     simulator = Simulator(args)
-    if args.autoplay:
-        simulator.autoplay()
-    else:
-        simulator.run()
+    try:
+        if args.autoplay:
+            simulator.autoplay()
+        elif args.replay_game is not None:
+            swap_players, board_size, seed = simulator.game_setup(args.replay_game)
+            simulator.run(
+                swap_players=swap_players,
+                board_size=board_size,
+                seed=seed,
+                index=args.replay_game,
+            )
+        else:
+            simulator.run()
+    finally:
+        simulator.close()
@@ -0,0 +1,77 @@
+import csv
+import json
+import os
+
+MOVES_FILE = "moves.jsonl"
+GAMES_FILE = "games.csv"
+
+GAME_FIELDS = (
+    "game",
+    "player_1",
+    "player_2",
+    "board_size",
+    "moves",
+    "p0_score",
+    "p1_score",
+    "p0_time",
+    "p1_time",
+    "p0_random_walks",
+    "p1_random_walks",
+    "p0_timeouts",
+    "p1_timeouts",
+    "copy_time",
+    "validation_time",
+    "barrier_time",
+    "endgame_time",
+)
+
+
+def to_json(value):
+    """
+    Convert the numpy scalars that agents may report to plain Python values.
+    """
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def write_stats(stats_path, game, move_stats, game_stats):
+    """
+    Append the stats of a game to the stats directory.
+
+    Moves go to moves.jsonl, one JSON object per move, as their metrics depend on
+    the agents. The summary of the game goes to games.csv.
+
+    Parameters
+    ----------
+    stats_path : str
+        The stats directory, created if needed.
+    game : int
+        The index of the game in its batch.
+    move_stats : list of dict
+        The stats of every move, World.move_stats.
+    game_stats : dict
+        The summary of the game, World.game_stats().
+    """
+    os.makedirs(stats_path, exist_ok=True)
+    with open(os.path.join(stats_path, MOVES_FILE), "a") as f:
+        for move in move_stats:
+            line = json.dumps({"game": game, **move}, separators=(",", ":"), default=to_json)
+            f.write(line + "\n")
+    games_file = os.path.join(stats_path, GAMES_FILE)
+    write_header = not os.path.exists(games_file) or os.path.getsize(games_file) == 0
+    with open(games_file, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=GAME_FIELDS, extrasaction="ignore")
+        if write_header:
+            writer.writeheader()
+        writer.writerow({"game": game, **game_stats})
+
+
+def read_move_stats(stats_path):
+    """
+    Stream the stats of every move of a stats directory, one dict at a time.
+    """
+    with open(os.path.join(stats_path, MOVES_FILE)) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -1,8 +1,42 @@
 import pytest
 from world import World
+from agents.student_agent import MonteCarlo
 import numpy as np
 
 
+@pytest.fixture
+def play_game():
+    """
+    Play a whole game, player_1 is a registered name or an agent instance.
+    """
+
+    def play(player_1="random_agent", seed=0, **world_kwargs):
+        world_kwargs.setdefault("board_size", 6)
+        world = World(player_1, seed=seed, **world_kwargs)
+        is_end = False
+        while not is_end:
+            is_end, _, _ = world.step()
+        return world
+
+    return play
+
+
+@pytest.fixture
+def monte_carlo():
+    """
+    Make a MonteCarlo search of the first position of a seeded 6x6 game.
+    """
+
+    def make(**kwargs):
+        world = World(board_size=6, seed=0)
+        _, my_pos, adv_pos = world.get_current_player()
+        return MonteCarlo(
+            world.chess_board, tuple(my_pos), tuple(adv_pos), world.max_step, **kwargs
+        )
+
+    return make
+
+
 @pytest.fixture
 def world_init():
     world = World()
@@ -4,6 +4,15 @@ import random
 import numpy as np
 from world import World
 from agents import *
+from agents.student_agent import MonteCarlo, worker_search, _worker_searches
+from agents.transposition import TranspositionTable, Zobrist
+from agents.rollout import RandomRollout, HeuristicRollout, EpsilonGreedyRollout
+from agents.time_manager import TimeManager, MoveClock
+from agents.endgame_solver import EndgameSolver
+from agents.batch_rollout import BatchRollout
+from connectivity import check_separation, region_scores
+from movegen import legal_moves
+from constants import MOVES, OPPOSITES
 from copy import deepcopy
 
 
@@ -34,3 +43,288 @@ def test_step(board_size, agent):
     assert dir in [0, 1, 2, 3]
     next_pos = np.asarray(next_pos, dtype=cur_pos.dtype)
     assert world.check_boundary(next_pos)
+
+
+def test_monte_carlo_tree_reuse(monte_carlo):
+    mc = monte_carlo(rng=np.random.default_rng(0), time=0)
+    chess_board, my_pos, adv_pos, max_step = mc.chess_board, mc.my_pos, mc.adv_pos, mc.max_step
+    mc.preprocessing = False
+    mc.get_play(chess_board, my_pos, adv_pos, max_step)
+    for _ in range(300):
+        mc.run_sim()
+    assert mc.root.plays == 300
+    play = max(mc.root.children, key=lambda move: mc.tt.peek(mc.root.children[move]).plays)
+    # The most searched reply of the adversary to our play
+    ours = mc.tt.peek(mc.root.children[play])
+    reply, key = max(ours.children.items(), key=lambda item: mc.tt.peek(item[1]).plays)
+    board = deepcopy(chess_board)
+    mc.make_move(board, *play[0], play[1], [])
+    mc.make_move(board, *reply[0], reply[1], [])
+    plays = mc.tt.peek(key).plays
+    # Statistics of the position carry over to the next search
+    mc.get_play(board, play[0], reply[0], max_step)
+    assert mc.root is mc.tt.peek(key)
+    assert mc.root.plays == plays
+    assert mc.tt.stats()["hits"] > 0
+    metrics = mc.get_metrics()
+    assert metrics["root_plays"] == plays and metrics["sims"] >= 0
+
+
+def test_transposition_table_eviction():
+    tt = TranspositionTable(capacity=8)
+    for key in range(8):
+        tt.store(key).plays = key
+    tt.new_search()
+    assert tt.get(0) is not None
+    tt.store(8)
+    # The least played entries of the previous search go first
+    assert len(tt) == 7
+    assert 0 in tt.entries and 1 not in tt.entries and 2 not in tt.entries
+    assert tt.stats()["evictions"] == 2
+
+
+def test_zobrist_incremental(world_1):
+    zobrist = Zobrist(world_1.board_size, np.random.default_rng(0))
+    board_hash = zobrist.hash_board(world_1.chess_board)
+    world_1.set_barrier(2, 2, 0)
+    assert board_hash ^ zobrist.barrier(2, 2, 0) == zobrist.hash_board(
+        world_1.chess_board
+    )
+
+
+def test_monte_carlo_root_parallel(monte_carlo):
+    mc = monte_carlo(rng=np.random.default_rng(0), workers=3, time=0.5)
+    chess_board, my_pos, adv_pos, max_step = mc.chess_board, mc.my_pos, mc.adv_pos, mc.max_step
+    mc.preprocessing = False
+    start_workers = mc.start_workers
+    pending = []
+    mc.start_workers = lambda *args: pending.extend(start_workers(*args)) or pending
+    play = mc.get_play(chess_board, my_pos, adv_pos, max_step)
+    assert len(pending) == 2
+    assert all(result.get() for result in pending)
+    assert play in legal_moves(chess_board, my_pos, adv_pos, max_step)
+
+
+def test_worker_search_new_board(monte_carlo):
+    # tokens are never reused, even once the search that had one is freed
+    token = monte_carlo().token
+    assert monte_carlo().token != token
+    # a search kept under a token is rebuilt for a board of another size
+    for board_size in (6, 9, 6):
+        world = World(board_size=board_size, seed=0)
+        _, my_pos, adv_pos = world.get_current_player()
+        my_pos, adv_pos = tuple(my_pos), tuple(adv_pos)
+        stats = worker_search(
+            (token, world.chess_board, my_pos, adv_pos, world.max_step, MoveClock(0.05), 0, {})
+        )
+        assert _worker_searches[token].zobrist.board_size == board_size
+        moves = legal_moves(world.chess_board, my_pos, adv_pos, world.max_step)
+        assert stats and all(move in moves for move in stats)
+    del _worker_searches[token]
+
+
+@pytest.mark.parametrize("bitboard", [False, True])
+def test_monte_carlo_run_sim_restores_board(bitboard):
+    world = World(player_1="student_agent", board_size=7, seed=1, bitboard=bitboard)
+    _, my_pos, adv_pos = world.get_current_player()
+    my_pos, adv_pos = tuple(my_pos), tuple(adv_pos)
+    mc = MonteCarlo(world.chess_board, my_pos, adv_pos, world.max_step)
+    mc.search(world.chess_board, my_pos, adv_pos, world.max_step, MoveClock(0))
+    board = deepcopy(mc.scratch_board)
+    for _ in range(20):
+        mc.run_sim()
+        assert np.array_equal(np.asarray(mc.scratch_board), np.asarray(board))
+    assert mc.root.plays == 20
+
+
+def test_monte_carlo_check_separation(world_2):
+    mc = MonteCarlo(world_2.chess_board, (0, 2), (2, 2), world_2.max_step)
+    board = deepcopy(world_2.chess_board)
+    # Reopen a wall between the zones of both players (15 and 10 cells)
+    board[2, 2, 2] = board[3, 2, 0] = False
+    assert region_scores(board, (2, 2), (0, 2))[0]
+    mc.make_move(board, 2, 2, 2, [])
+    assert mc.check_separation(board, 2, 2, 2, (2, 2), (0, 2), 25) == (True, -1, 25)
+    assert region_scores(board, (2, 2), (0, 2)) == (False, 10, 15)
+    # A wall that does not split the region
+    board[2, 2, 2] = board[3, 2, 0] = False
+    mc.make_move(board, 2, 2, 0, [])
+    assert mc.check_separation(board, 2, 2, 0, (2, 2), (0, 2), 25) == (False, 0, 25)
+
+
+def test_heuristic_rollout_avoids_enclosure():
+    board = np.zeros((5, 5, 4), dtype=bool)
+    board[0, :, 0] = board[:, 4, 1] = board[4, :, 2] = board[:, 0, 3] = True
+    # (1, 1) is a dead end, a fourth wall there would enclose us
+    board[1, 1, 0] = board[1, 1, 3] = board[1, 1, 1] = True
+    policy = HeuristicRollout()
+    rng = np.random.default_rng(0)
+    moves = [((1, 1), 2), ((2, 1), 0), ((2, 1), 1)]
+    for _ in range(10):
+        move = policy.choose_move(moves, board, (2, 1), (2, 3), rng)
+        # The wall facing the adversary
+        assert move == ((2, 1), 1)
+
+
+def test_epsilon_greedy_rollout():
+    moves = [((0, 0), 1), ((3, 3), 0), ((4, 4), 3)]
+    board = np.zeros((5, 5, 4), dtype=bool)
+    rng = np.random.default_rng(0)
+    greedy = EpsilonGreedyRollout(epsilon=0.0)
+    assert {greedy.choose_move(moves, board, (0, 0), (4, 3), rng) for _ in range(20)} == {
+        ((4, 4), 3)
+    }
+    random_moves = EpsilonGreedyRollout(epsilon=1.0)
+    assert {
+        random_moves.choose_move(moves, board, (0, 0), (4, 3), rng) for _ in range(50)
+    } == set(moves)
+
+
+@pytest.mark.parametrize("rollout", [RandomRollout(), HeuristicRollout()])
+def test_monte_carlo_rollout_policy(monte_carlo, rollout):
+    mc = monte_carlo(rollout=rollout)
+    mc.search(mc.chess_board, mc.my_pos, mc.adv_pos, mc.max_step, MoveClock(0))
+    for _ in range(50):
+        mc.run_sim()
+    assert mc.root.plays == 50
+
+
+def test_monte_carlo_tree_moves(world_1):
+    my_pos, adv_pos = (0, 0), (4, 4)
+    mc = MonteCarlo(world_1.chess_board, my_pos, adv_pos, world_1.max_step, top_k=5)
+    moves = mc.get_tree_moves(0, world_1.chess_board, my_pos, adv_pos, world_1.max_step)
+    # Cached for the search, the children of a position don't change
+    assert mc.get_tree_moves(0, world_1.chess_board, my_pos, adv_pos, world_1.max_step) is moves
+    all_moves = mc.get_moves(world_1.chess_board, my_pos, adv_pos, world_1.max_step)
+    assert len(moves) == 5 and set(moves) <= set(all_moves)
+    values = HeuristicRollout().values(all_moves, world_1.chess_board, adv_pos)
+    assert min(HeuristicRollout().values(moves, world_1.chess_board, adv_pos)) == sorted(values)[-5]
+    mc.search(world_1.chess_board, my_pos, adv_pos, world_1.max_step, MoveClock(0))
+    for _ in range(20):
+        mc.run_sim()
+    assert len(mc.root.children) == 5
+
+
+def test_move_clock():
+    now = [0.0]
+    clock = MoveClock(2.0, target=1.0, clock=lambda: now[0], min_time=0.1)
+    assert not clock.should_stop(0, [])
+    now[0] = 0.05
+    assert not clock.should_stop(50, [30, 20])
+    assert clock.batch_size == 20 # 1000 sims/s, batches of 0.02s
+    # 950 simulations left before the target cannot overturn a lead of 1000
+    now[0] = 0.5
+    assert not clock.should_stop(500, [300, 200, 0])
+    assert clock.should_stop(500, [1200, 100, 0])
+    # Past the target, only close calls go on until the deadline
+    now[0] = 1.5
+    assert clock.should_stop(1500, [800, 500])
+    assert not clock.should_stop(1500, [800, 750])
+    now[0] = 2.0
+    assert clock.should_stop(2000, [800, 750])
+    # A single legal move needs no search
+    assert MoveClock(2.0, clock=lambda: 0.01).should_stop(1, [1])
+
+
+def test_time_manager_phases():
+    manager = TimeManager(move_time=2.0, first_move_time=30.0)
+    assert manager.target(first_move=True) == 15.0
+    assert manager.target(region_fraction=0.9) < manager.target(region_fraction=0.5)
+    assert manager.target(region_fraction=0.1) < manager.target(region_fraction=0.5)
+    move_clock = manager.start_move(region_fraction=0.5)
+    assert move_clock.deadline - move_clock.begin == 2.0
+
+
+def open_board(board_size):
+    board = np.zeros((board_size, board_size, 4), dtype=bool)
+    board[0, :, 0] = board[:, -1, 1] = board[-1, :, 2] = board[:, 0, 3] = True
+    return board
+
+
+def test_endgame_solver():
+    board = open_board(3)
+    my_pos, adv_pos, max_step = (0, 0), (2, 2), 2
+    solver = EndgameSolver(3, np.random.default_rng(0))
+    value, move = solver.solve(board, my_pos, adv_pos, max_step)
+    assert np.array_equal(board, open_board(3))
+    # The value is the best outcome over the moves, each solved from scratch
+    values = {}
+    for (r, c), dir in legal_moves(board, my_pos, adv_pos, max_step):
+        child = deepcopy(board)
+        child[r, c, dir] = True
+        child[r + MOVES[dir][0], c + MOVES[dir][1], OPPOSITES[dir]] = True
+        ended, score, _ = check_separation(child, r, c, dir, (r, c), adv_pos, 9)
+        if not ended:
+            solved = EndgameSolver(3, np.random.default_rng(1)).solve(
+                child, adv_pos, (r, c), max_step
+            )
+            score = -solved[0]
+        values[((r, c), dir)] = score
+    assert value == max(values.values()) == 1
+    assert values[move] == value
+    # Out of nodes, nothing is proven
+    assert EndgameSolver(3, np.random.default_rng(0), max_nodes=1).solve(
+        board, my_pos, adv_pos, max_step
+    ) is None
+
+
+def test_student_agent_solves_endgame():
+    board = open_board(3)
+    agent = StudentAgent()
+    agent.monte_carlo = MonteCarlo(board, (0, 0), (2, 2), 2)
+    agent.monte_carlo.get_play = None # proven win, no need for MCTS
+    agent.solver = EndgameSolver(3, np.random.default_rng(0))
+    value, move = agent.solver.solve(board, (0, 0), (2, 2), 2)
+    assert agent.step(board, (0, 0), (2, 2), 2) == move
+    assert agent.get_metrics()["solved"]
+
+
+def test_student_agent_new_game():
+    agent = StudentAgent()
+    # search and solver of a previous game on a smaller board
+    agent.monte_carlo = MonteCarlo(open_board(2), (0, 0), (1, 1), 1)
+    agent.solver = EndgameSolver(2, np.random.default_rng(0))
+    agent.set_seed(0)
+    assert agent.monte_carlo is None and agent.solver is None
+    move = agent.step(open_board(3), (0, 0), (2, 2), 2)
+    assert agent.get_metrics()["solved"]
+    assert move in legal_moves(open_board(3), (0, 0), (2, 2), 2)
+    assert agent.monte_carlo.rng is agent.rng
+
+
+def test_batch_rollout_moves(world_1):
+    batch = BatchRollout(32, rng=np.random.default_rng(0))
+    boards = np.broadcast_to(world_1.chess_board, (32, 5, 5, 4)).copy()
+    my_pos = np.tile([2, 3], (32, 1))
+    adv_pos = np.tile([2, 1], (32, 1))
+    moves = batch.random_moves(boards, my_pos, adv_pos, world_1.max_step)
+    legal = set(legal_moves(world_1.chess_board, (2, 3), (2, 1), world_1.max_step))
+    assert all(((r, c), dir) in legal for r, c, dir in moves.tolist())
+    # The number of walls at each corner follows the walls put
+    degrees = np.broadcast_to(batch.corner_degrees(world_1.chess_board), (32, 6, 6)).copy()
+    batch.set_barriers(boards, moves, degrees)
+    for board, board_degrees in zip(boards, degrees):
+        assert np.array_equal(batch.corner_degrees(board), board_degrees)
+
+
+def test_batch_rollout_outcomes():
+    # A corridor of 3 cells: staying and closing it loses, moving next to the
+    # adversary and closing it wins, moving and closing behind us ties
+    board = open_board(3)
+    board[0, :, 2] = board[1, :, 0] = True
+    outcomes = BatchRollout(300, rng=np.random.default_rng(0)).run(board, (0, 0), (0, 2), 2)
+    assert np.array_equal(board[0, :, 2], [True] * 3)
+    counts = np.bincount(outcomes + 1, minlength=3)
+    assert counts.sum() == 300 and counts.min() > 60
+
+
+def test_monte_carlo_batch_rollouts(monte_carlo):
+    # seeded: a simulation whose new move ends the game counts a single play
+    mc = monte_carlo(batch_rollouts=16, rng=np.random.default_rng(0))
+    mc.search(mc.chess_board, mc.my_pos, mc.adv_pos, mc.max_step, MoveClock(0))
+    board = deepcopy(mc.scratch_board)
+    for _ in range(10):
+        mc.run_sim()
+    assert np.array_equal(mc.scratch_board, board)
+    assert mc.root.plays == 160
+    assert sum(mc.tt.peek(key).plays for key in mc.root.children.values()) == 160
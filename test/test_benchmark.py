@@ -0,0 +1,21 @@
+import pytest
+from benchmark import BENCHMARKS, Benchmark, compare
+
+
+@pytest.mark.parametrize("name", BENCHMARKS)
+def test_run_case(name):
+    result = Benchmark(seed=0, repeat=2).run_case(name, 6, "incremental", False)
+    assert result["name"] == name and result["board_size"] == 6
+    assert result["number"] >= 1
+    assert 0 < result["best"] <= result["median"]
+
+
+def test_compare():
+    baseline = [
+        {"name": "game", "board_size": 6, "backend": "incremental", "bitboard": False, "best": 1.0},
+        {"name": "game", "board_size": 8, "backend": "incremental", "bitboard": False, "best": 1.0},
+    ]
+    results = [dict(case, best=best) for case, best in zip(baseline, (1.1, 1.5))]
+    regressions = compare(results, baseline, tolerance=0.2)
+    assert [result["board_size"] for result, _ in regressions] == [8]
+    assert results[0]["ratio"] == pytest.approx(1.1)
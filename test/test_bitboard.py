@@ -0,0 +1,68 @@
+import pytest
+import numpy as np
+from copy import deepcopy
+from bitboard import BitBoard, popcount
+from connectivity import RegionTracker
+from world import World
+
+
+def test_array_round_trip(world_1):
+    board = BitBoard.from_array(world_1.chess_board)
+    assert board.shape == world_1.chess_board.shape
+    assert np.array_equal(board.to_array(), world_1.chess_board)
+    assert np.array_equal(np.asarray(board), world_1.chess_board)
+    for r, c, dir in np.ndindex(*board.shape):
+        assert board[r, c, dir] == world_1.chess_board[r, c, dir]
+
+
+def test_borders():
+    board = BitBoard(5)
+    chess_board = np.zeros((5, 5, 4), dtype=bool)
+    chess_board[0, :, 0] = True
+    chess_board[:, 0, 3] = True
+    chess_board[-1, :, 2] = True
+    chess_board[:, -1, 1] = True
+    assert np.array_equal(board.to_array(), chess_board)
+
+
+def test_copy_and_set_barrier():
+    board = BitBoard(5)
+    board_copy = deepcopy(board)
+    board_copy.set_barrier(2, 2, 1)
+    assert board_copy[2, 2, 1] and board_copy[2, 3, 3]
+    assert not board[2, 2, 1] and not board[2, 3, 3]
+    assert board != board_copy
+
+
+@pytest.mark.parametrize("end_pos", [(1, 1), (0, 2), (0, 4), (3, 1), (4, 2), (2, 0)])
+def test_reachable(world_1, end_pos):
+    board = BitBoard.from_array(world_1.chess_board)
+    reach = board.reachable(
+        tuple(world_1.p0_pos), tuple(world_1.p1_pos), world_1.max_step
+    )
+    dir = next(d for d in range(4) if not world_1.chess_board[end_pos][d])
+    assert bool(reach & board.cell_bit(end_pos)) == world_1.check_valid_step(
+        world_1.p0_pos, np.asarray(end_pos), dir
+    )
+
+
+def test_region_scores(world_2):
+    board = BitBoard.from_array(world_2.chess_board)
+    assert board.region_scores(world_2.p0_pos, world_2.p1_pos) == (False, 15, 10)
+    tracker = RegionTracker(world_2.chess_board)
+    region = board.region((0, 0))
+    assert popcount(region) == tracker.region_size((0, 0))
+    for pos in board.cells(region):
+        assert tracker.connected(pos, (0, 0))
+
+
+@pytest.mark.parametrize("board_size", [7, 12])
+def test_world_bitboard_game(board_size):
+    world = World(board_size=board_size, bitboard=True, seed=0)
+    assert isinstance(world.chess_board, BitBoard)
+    is_end, p0_score, p1_score = world.step()
+    while not is_end:
+        is_end, p0_score, p1_score = world.step()
+    world.endgame_backend = "vectorized"
+    assert world.check_endgame() == (is_end, p0_score, p1_score)
+    assert all(isinstance(wall, int) for wall in world.chess_board.walls)
@@ -0,0 +1,77 @@
+import pytest
+import numpy as np
+from connectivity import RegionTracker, label_regions, split_search
+
+
+@pytest.mark.parametrize("pos_b", [(0, 0), (0, 4), (2, 2), (4, 0), (4, 4)])
+def test_split_search(world_2, pos_b):
+    board = world_2.chess_board
+    tracker = RegionTracker(board)
+    side = split_search(board, (0, 2), pos_b)
+    assert (side is None) == tracker.connected((0, 2), pos_b)
+    if side is not None:
+        assert len(side) in (tracker.region_size((0, 2)), tracker.region_size(pos_b))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_region_tracker_incremental(world_init, seed):
+    rng = np.random.RandomState(seed)
+    world = world_init
+    world.p0_pos = np.asarray([0, 0])
+    world.p1_pos = np.asarray([4, 4])
+    tracker = world.get_region_tracker()
+    for _ in range(30):
+        r, c = rng.randint(0, world.board_size, size=2)
+        dir = rng.randint(0, 4)
+        if world.chess_board[r, c, dir]:
+            continue
+        world.set_barrier(r, c, dir)
+        expected = RegionTracker(world.chess_board)
+        for r in range(world.board_size):
+            for c in range(world.board_size):
+                assert tracker.region_size((r, c)) == expected.region_size((r, c))
+                assert tracker.connected((r, c), (0, 0)) == expected.connected(
+                    (r, c), (0, 0)
+                )
+
+
+def test_check_endgame_after_set_barrier(world_1):
+    is_end, _, _ = world_1.check_endgame()
+    assert not is_end
+    for r, c, dir in ((1, 1, 2), (1, 2, 2), (2, 3, 0), (1, 4, 2), (2, 0, 0)):
+        world_1.set_barrier(r, c, dir)
+    results = world_1.check_endgame()
+    # Same results as a tracker rebuilt from scratch
+    world_1.region_tracker = None
+    assert world_1.check_endgame() == results
+
+
+def test_check_endgame_vectorized_world_1(world_1):
+    world_1.endgame_backend = "vectorized"
+    assert world_1.check_endgame() == (False, 25, 25)
+
+
+def test_check_endgame_vectorized_world_2(world_2):
+    world_2.endgame_backend = "vectorized"
+    assert world_2.check_endgame() == (True, 15, 10)
+
+
+@pytest.mark.parametrize("board_size", [5, 12, 32])
+def test_label_regions_matches_tracker(board_size):
+    rng = np.random.RandomState(board_size)
+    boards = rng.rand(3, board_size, board_size, 4) < 0.3
+    # Make the walls consistent between neighbouring cells
+    boards[:, :, 1:, 3] = boards[:, :, :-1, 1]
+    boards[:, 1:, :, 0] = boards[:, :-1, :, 2]
+    boards[:, 0, :, 0] = boards[:, -1, :, 2] = True
+    boards[:, :, 0, 3] = boards[:, :, -1, 1] = True
+    labels = label_regions(boards)
+    for board, board_labels in zip(boards, labels):
+        tracker = RegionTracker(board)
+        assert np.array_equal(board_labels, label_regions(board))
+        for r in range(board_size):
+            for c in range(board_size):
+                for n_r, n_c in ((0, 0), (r, board_size - 1)):
+                    assert (
+                        board_labels[r, c] == board_labels[n_r, n_c]
+                    ) == tracker.connected((r, c), (n_r, n_c))
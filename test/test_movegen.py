@@ -0,0 +1,28 @@
+import pytest
+import numpy as np
+from bitboard import BitBoard
+from movegen import legal_moves, reachable_cells
+
+
+@pytest.mark.parametrize("turn", [0, 1])
+def test_legal_moves_match_check_valid_step(world_1, turn):
+    world_1.turn = turn
+    my_pos, adv_pos = (
+        (world_1.p0_pos, world_1.p1_pos) if not turn else (world_1.p1_pos, world_1.p0_pos)
+    )
+    moves = set(legal_moves(world_1.chess_board, my_pos, adv_pos, world_1.max_step))
+    for r, c, dir in np.ndindex(*world_1.chess_board.shape):
+        assert (((r, c), dir) in moves) == world_1.check_valid_step(
+            my_pos, np.asarray((r, c)), dir
+        )
+
+
+def test_legal_moves_bitboard(world_1):
+    board = BitBoard.from_array(world_1.chess_board)
+    args = (world_1.p0_pos, world_1.p1_pos, world_1.max_step)
+    assert set(legal_moves(board, *args)) == set(
+        legal_moves(world_1.chess_board, *args)
+    )
+    cells = reachable_cells(board, *args)
+    assert cells[0] == tuple(world_1.p0_pos)
+    assert tuple(world_1.p1_pos) not in cells
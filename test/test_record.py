@@ -0,0 +1,33 @@
+import numpy as np
+from record import GameRecord, read_records, write_records
+from replay import replay, replay_file
+
+
+def test_record_round_trip(play_game):
+    world = play_game(seed=1)
+    record = GameRecord.from_json(world.game_record.to_json())
+    assert np.array_equal(record.chess_board, world.game_record.chess_board)
+    assert record.p0_pos == world.game_record.p0_pos
+    assert record.moves == world.game_record.moves
+    assert tuple(record.scores) == world.game_record.scores
+    assert record.seed.entropy == world.seed.entropy
+
+
+def test_replay_matches_game(play_game):
+    world = play_game(seed=2, bitboard=True)
+    replayed, results = replay(world.game_record, validate=True)
+    assert results == world.results_cache
+    assert np.array_equal(replayed.chess_board, np.asarray(world.chess_board))
+    assert np.array_equal(replayed.p0_pos, world.p0_pos)
+    assert np.array_equal(replayed.p1_pos, world.p1_pos)
+
+
+def test_replay_file(play_game, tmp_path):
+    path = tmp_path / "games.jsonl"
+    worlds = [play_game(seed=seed) for seed in range(3)]
+    write_records(path, [world.game_record for world in worlds])
+    assert len(list(read_records(path))) == 3
+    for world, (record, results) in zip(
+        worlds, replay_file(path, endgame_backend="vectorized")
+    ):
+        assert results == world.results_cache
@@ -0,0 +1,59 @@
+import os
+import pytest
+from agents.random_agent import RandomAgent
+from agents.remote_agent import RemoteAgent
+from store import AGENT_REGISTRY
+
+
+class CrashingAgent(RandomAgent):
+    def step(self, chess_board, my_pos, adv_pos, max_step):
+        if not chess_board[my_pos[0], my_pos[1], 0]:
+            os._exit(1)
+        return super().step(chess_board, my_pos, adv_pos, max_step)
+
+
+@pytest.fixture
+def remote_agent():
+    agent = RemoteAgent("random_agent", max_games=2)
+    yield agent
+    agent.close()
+
+
+@pytest.mark.parametrize("bitboard", [False, True])
+def test_remote_game_matches_local(play_game, remote_agent, bitboard):
+    for seed in range(2):
+        local = play_game("random_agent", seed, bitboard=bitboard)
+        remote = play_game(remote_agent, seed, bitboard=bitboard)
+        assert [move[:3] for move in remote.game_record.moves] == [
+            move[:3] for move in local.game_record.moves
+        ]
+        assert remote.game_record.scores == local.game_record.scores
+        assert remote.player_1_name == "random_agent"
+        assert not any(move["random_walk"] for move in remote.move_stats)
+        assert remote.move_stats[0]["agent_worker_rss"] > 0
+
+
+def test_remote_worker_recycling(play_game, remote_agent):
+    pid = remote_agent.process.pid
+    play_game(remote_agent, 0)
+    play_game(remote_agent, 1)
+    assert remote_agent.process.pid == pid and remote_agent.restarts == 0
+    play_game(remote_agent, 2)
+    assert remote_agent.process.pid != pid and remote_agent.restarts == 1
+    remote_agent.max_games = None
+    remote_agent.max_rss = 1
+    play_game(remote_agent, 3)
+    assert remote_agent.restarts == 2
+
+
+def test_remote_worker_crash(play_game, monkeypatch):
+    # the worker builds its agent from the registry
+    monkeypatch.setitem(AGENT_REGISTRY, "crashing_agent", CrashingAgent)
+    agent = RemoteAgent("crashing_agent")
+    world = play_game(agent, 0)
+    # The world survives the worker and plays random walks instead
+    assert any(move["random_walk"] for move in world.move_stats[::2])
+    assert not agent.process.is_alive()
+    play_game(agent, 1)
+    assert agent.restarts == 1
+    agent.close()
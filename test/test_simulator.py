@@ -0,0 +1,125 @@
+import argparse
+import numpy as np
+import pytest
+from early_stop import H0, H1, SPRT, ConfidenceStop, wilson_interval
+from record import read_records
+from simulator import Simulator
+
+
+def autoplay_args(**kwargs):
+    args = dict(
+        player_1="random_agent",
+        player_2="random_agent",
+        board_size=None,
+        board_size_min=5,
+        board_size_max=7,
+        display=False,
+        display_delay=0,
+        display_save=False,
+        display_save_path=None,
+        autoplay=True,
+        autoplay_runs=20,
+        early_stop="none",
+        min_games=10,
+        confidence=0.95,
+        sprt_elo0=0.0,
+        sprt_elo1=50.0,
+        sprt_alpha=0.05,
+        sprt_beta=0.05,
+        seed=0,
+        record_path=None,
+        stats_path=None,
+        workers=1,
+        endgame_backend="incremental",
+        bitboard=False,
+        move_time_limit=None,
+        first_move_time_limit=None,
+        game_time_limit=None,
+        remote=False,
+        remote_max_games=None,
+        remote_max_rss=None,
+    )
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(50, 100)
+    assert low == pytest.approx(1 - high) and 0.40 < low < 0.41
+    low, high = wilson_interval(10, 10)
+    assert high == 1.0 and 0.69 < low < 0.73
+
+
+def test_sprt():
+    sprt = SPRT()
+    for _ in range(10):
+        sprt.add(1)
+    assert sprt.decision() == H1
+    sprt = SPRT()
+    for _ in range(10):
+        sprt.add(0)
+    assert sprt.decision() == H0
+    sprt = SPRT()
+    for score in (1, 0, 0.5, 1, 0):
+        sprt.add(score)
+    assert sprt.n == 5 and sprt.score == 2.5 and sprt.decision() is None
+
+
+def test_confidence_stop():
+    stop = ConfidenceStop()
+    for score in (1, 0) * 10:
+        stop.add(score)
+    assert stop.decision() is None
+    for _ in range(20):
+        stop.add(1)
+    assert stop.decision() == H1
+
+
+def test_autoplay_early_stop():
+    n_games, p1_wins, p2_wins, decision = Simulator(autoplay_args()).autoplay()
+    assert n_games == 20 and decision is None
+    assert p1_wins + p2_wins >= n_games
+    # Random agents are an even match, a large Elo difference is rejected early
+    n_games, _, _, decision = Simulator(
+        autoplay_args(early_stop="sprt", sprt_elo1=800, autoplay_runs=200)
+    ).autoplay()
+    assert decision == H0 and n_games < 200
+
+
+def record_moves(record):
+    # the moves of a record, without their think times
+    return [(r, c, dir) for r, c, dir, _ in record.moves]
+
+
+def test_autoplay_workers(tmp_path):
+    outcomes = {}
+    records = {}
+    for workers in (1, 2):
+        record_path = str(tmp_path / f"records_{workers}.jsonl")
+        n_games, p1_wins, p2_wins, _ = Simulator(
+            autoplay_args(autoplay_runs=6, workers=workers, record_path=record_path)
+        ).autoplay()
+        outcomes[workers] = (n_games, p1_wins, p2_wins)
+        records[workers] = list(read_records(record_path))
+    # every game is set up from its index, so the workers play the same games
+    assert outcomes[1] == outcomes[2]
+    assert len(records[1]) == len(records[2]) == 6
+    for record_1, record_2 in zip(records[1], records[2]):
+        assert np.array_equal(record_1.chess_board, record_2.chess_board)
+        assert record_1.players == record_2.players
+        assert record_moves(record_1) == record_moves(record_2)
+
+
+def test_replay_autoplay_game(tmp_path):
+    record_path = str(tmp_path / "records.jsonl")
+    Simulator(autoplay_args(autoplay_runs=4, seed=3, record_path=record_path)).autoplay()
+    records = list(read_records(record_path))
+    # any game of the batch is replayed from the seed of the batch and its index
+    simulator = Simulator(autoplay_args(autoplay=False, seed=3))
+    for index in (1, 2):
+        swap_players, board_size, seed = simulator.game_setup(index)
+        simulator.run(swap_players=swap_players, board_size=board_size, seed=seed, index=index)
+        record = simulator.world.game_record
+        assert np.array_equal(record.chess_board, records[index].chess_board)
+        assert record_moves(record) == record_moves(records[index])
@@ -0,0 +1,51 @@
+import csv
+import numpy as np
+from agents.random_agent import RandomAgent
+from stats import GAMES_FILE, read_move_stats, write_stats
+
+
+class CountingAgent(RandomAgent):
+    def __init__(self):
+        super().__init__()
+        self.name = "CountingAgent"
+        self.steps = 0
+
+    def step(self, chess_board, my_pos, adv_pos, max_step):
+        self.steps += 1
+        return super().step(chess_board, my_pos, adv_pos, max_step)
+
+    def get_metrics(self):
+        return {"steps": np.int64(self.steps)}
+
+
+def test_move_stats(play_game):
+    world = play_game(CountingAgent(), 0)
+    assert len(world.move_stats) == len(world.game_record.moves)
+    for i, move in enumerate(world.move_stats):
+        assert move["move"] == i and move["player"] == i % 2
+        assert move["think_time"] >= 0 and move["endgame_time"] >= 0
+        assert not move["random_walk"]
+    # Only the first player reports metrics
+    assert [move["agent_steps"] for move in world.move_stats[::2]] == list(
+        range(1, len(world.move_stats[::2]) + 1)
+    )
+    assert "agent_steps" not in world.move_stats[1]
+    stats = world.game_stats()
+    assert stats["moves"] == len(world.move_stats)
+    assert (stats["p0_score"], stats["p1_score"]) == world.game_record.scores
+    assert stats["player_1"] == "CountingAgent"
+
+
+def test_write_stats(play_game, tmp_path):
+    worlds = [play_game(CountingAgent(), seed) for seed in range(2)]
+    for game, world in enumerate(worlds):
+        write_stats(tmp_path, game, world.move_stats, world.game_stats())
+    moves = list(read_move_stats(tmp_path))
+    assert len(moves) == sum(len(world.move_stats) for world in worlds)
+    assert moves[0]["game"] == 0 and moves[-1]["game"] == 1
+    assert moves[0]["agent_steps"] == 1
+    with open(tmp_path / GAMES_FILE) as f:
+        games = list(csv.DictReader(f))
+    assert [int(game["moves"]) for game in games] == [
+        len(world.move_stats) for world in worlds
+    ]
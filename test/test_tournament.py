@@ -0,0 +1,84 @@
+import argparse
+import pytest
+from agents.random_agent import RandomAgent
+from store import AGENT_REGISTRY
+from tournament import crosstable, elo_ratings, read_checkpoint, run_tournament, tournament_games
+
+
+class OtherRandomAgent(RandomAgent):
+    pass
+
+
+@pytest.fixture
+def agents(monkeypatch):
+    monkeypatch.setitem(AGENT_REGISTRY, "other_random_agent", OtherRandomAgent)
+    return ["random_agent", "other_random_agent"]
+
+
+def tournament_args(agents, checkpoint, rounds):
+    return argparse.Namespace(
+        agents=agents,
+        rounds=rounds,
+        board_size_min=5,
+        board_size_max=8,
+        seed=3,
+        workers=1,
+        checkpoint=checkpoint,
+        endgame_backend="incremental",
+        bitboard=False,
+        move_time_limit=None,
+        first_move_time_limit=None,
+        game_time_limit=None,
+    )
+
+
+def test_tournament_games():
+    games = tournament_games(["a", "b", "c"], 2, 0, 6, 12)
+    # 3 pairings, both colors, 2 rounds
+    assert len(games) == 12 and len({game["key"] for game in games}) == 12
+    for round in range(2):
+        # every pairing plays the same board in a round
+        assert len({g["board_size"] for g in games if g["round"] == round}) == 1
+
+
+def test_tournament_resume(agents, tmp_path):
+    checkpoint = str(tmp_path / "games.jsonl")
+    table, ratings = run_tournament(tournament_args(agents, checkpoint, 2))
+    assert len(read_checkpoint(checkpoint)) == 4
+    assert table["random_agent"]["other_random_agent"]["games"] == 4
+    # More rounds only play the new games
+    table, _ = run_tournament(tournament_args(agents, checkpoint, 3))
+    results = read_checkpoint(checkpoint)
+    assert len(results) == 6 and len({result["key"] for result in results}) == 6
+    cell = table["other_random_agent"]["random_agent"]
+    assert cell["games"] == 6
+    assert cell["wins"] == table["random_agent"]["other_random_agent"]["losses"]
+    assert sum(ratings.values()) == pytest.approx(0)
+
+
+def test_tournament_checks(agents, tmp_path):
+    with pytest.raises(ValueError):
+        run_tournament(tournament_args(["random_agent", "random_agent"], None, 1))
+    checkpoint = str(tmp_path / "games.jsonl")
+    run_tournament(tournament_args(agents, checkpoint, 1))
+    # the checkpoint was played on other boards
+    args = tournament_args(agents, checkpoint, 2)
+    args.board_size_max = 10
+    with pytest.raises(ValueError):
+        run_tournament(args)
+    assert len(read_checkpoint(checkpoint)) == 2
+
+
+def test_elo_ratings():
+    results = [
+        {"player_1": "a", "player_2": "b", "p0_score": 10, "p1_score": 5},
+        {"player_1": "b", "player_2": "a", "p0_score": 5, "p1_score": 10},
+        {"player_1": "b", "player_2": "c", "p0_score": 8, "p1_score": 8},
+        {"player_1": "a", "player_2": "c", "p0_score": 9, "p1_score": 3},
+        {"player_1": "c", "player_2": "a", "p0_score": 2, "p1_score": 7},
+    ]
+    table = crosstable(["a", "b", "c"], results)
+    assert table["a"]["b"]["score"] == 1.0 and table["b"]["c"]["draws"] == 1
+    ratings = elo_ratings(table)
+    assert ratings["a"] > ratings["b"] and ratings["a"] > ratings["c"]
+    assert ratings["b"] == pytest.approx(ratings["c"], abs=1)
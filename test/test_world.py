@@ -1,4 +1,13 @@
 import pytest
+import threading
+import numpy as np
+from copy import deepcopy
+from agents import Agent
+from agents.random_agent import RandomAgent
+from bitboard import BitBoard
+from boardgen import random_board, symmetric_walls
+from connectivity import region_scores
+from world import World
 
 
 @pytest.mark.parametrize("end_pos", [(0, 4), (0, 0), (2, 3), (3, 0), (4, 4)])
@@ -40,3 +49,140 @@ def test_check_endgame_world_2(world_2):
     assert is_end
     assert p0_score == 15
     assert p1_score == 10
+
+
+def test_get_agent_board_readonly(world_1):
+    board = world_1.get_agent_board(world_1.p0)
+    assert not world_1.p0.mutable_board
+    assert np.array_equal(board, world_1.chess_board)
+    with pytest.raises(ValueError):
+        board[0, 0, 0] = False
+    assert deepcopy(board).flags.writeable
+
+
+def test_get_agent_board_snapshot(world_1):
+    for bitboard in (False, True):
+        world = deepcopy(world_1)
+        if bitboard:
+            world.chess_board = BitBoard.from_array(world.chess_board)
+        board = world.get_agent_board(world.p0, snapshot=True)
+        world.set_barrier(2, 2, 0)
+        assert not board[2, 2, 0]
+        with pytest.raises(ValueError):
+            board[2, 2, 0] = True
+
+
+def test_get_agent_board_copy(world_1):
+    agent = Agent()
+    board = world_1.get_agent_board(agent)
+    board[2, 2, 0] = True
+    assert not world_1.chess_board[2, 2, 0]
+
+
+def test_get_agent_board_bitboard(world_1):
+    world_1.chess_board = BitBoard.from_array(world_1.chess_board)
+    board = world_1.get_agent_board(world_1.p0)
+    with pytest.raises(ValueError):
+        board.set_barrier(2, 2, 0)
+    board = deepcopy(board)
+    board.set_barrier(2, 2, 0)
+    assert board[2, 2, 0] and not world_1.chess_board[2, 2, 0]
+
+
+def test_seeded_world_is_reproducible(play_game):
+    world_a = play_game(seed=42, board_size=7)
+    world_b = play_game(seed=42, board_size=7)
+    assert np.array_equal(world_a.chess_board, world_b.chess_board)
+    assert [move[:3] for move in world_a.game_record.moves] == [
+        move[:3] for move in world_b.game_record.moves
+    ]
+    assert world_a.game_record.scores == world_b.game_record.scores
+
+
+class BlockedAgent(RandomAgent):
+    """
+    Random agent whose first step waits for the test to release it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.steps = 0
+
+    def step(self, chess_board, my_pos, adv_pos, max_step):
+        self.steps += 1
+        if self.steps == 1:
+            self.release.wait(10)
+        return super().step(chess_board, my_pos, adv_pos, max_step)
+
+
+def test_move_time_limit():
+    world = World(BlockedAgent(), "random_agent", board_size=8, seed=0, move_time_limit=0.05)
+    world.step()
+    world.step()
+    # The first step is still running, the second one times out without starting
+    world.step()
+    assert world.p0.steps == 1
+    world.p0.release.set()
+    world.agent_threads[0].join()
+    world.step()
+    world.step()
+    assert world.p0.steps == 2
+    timeouts = [move["timeout"] for move in world.move_stats]
+    assert timeouts == [True, False, True, False, False]
+    assert [move["random_walk"] for move in world.move_stats] == timeouts
+    stats = world.game_stats()
+    assert stats["p0_timeouts"] == 2 and stats["p1_timeouts"] == 0
+    assert stats["p0_time"] >= 0.05
+
+
+def test_game_time_limit():
+    world = World(board_size=8, seed=0, game_time_limit=0.0)
+    world.step()
+    assert world.move_stats[0]["timeout"]
+
+
+@pytest.mark.parametrize("board_size", range(5, 13))
+def test_random_board(board_size):
+    rng = np.random.default_rng(board_size)
+    for _ in range(50):
+        chess_board, p0_pos, p1_pos = random_board(board_size, rng)
+        # Symmetric walls, both sides of each wall, and the players on mirror cells
+        assert np.array_equal(chess_board, chess_board[::-1, ::-1][..., [2, 3, 0, 1]])
+        assert np.array_equal(chess_board[:-1, :, 2], chess_board[1:, :, 0])
+        assert np.array_equal(chess_board[:, :-1, 1], chess_board[:, 1:, 3])
+        assert np.array_equal(p1_pos, board_size - 1 - p0_pos)
+        assert not np.array_equal(p0_pos, p1_pos)
+        connected, _, _ = region_scores(chess_board, p0_pos, p1_pos)
+        assert connected
+
+
+@pytest.mark.parametrize("board_size", range(5, 13))
+def test_symmetric_walls(board_size):
+    walls = symmetric_walls(board_size)
+    # every inner wall once, in an orbit of two distinct walls
+    assert len(walls) == board_size * (board_size - 1)
+    assert not (walls[:, 0] == walls[:, 1]).all(axis=1).any()
+    assert len({tuple(wall) for wall in walls.reshape(-1, 3)}) == 2 * len(walls)
+
+
+def test_world_board_not_separated():
+    for seed in range(100):
+        world = World(board_size=5, seed=seed, bitboard=seed % 2 == 1)
+        is_end, _, _ = world.check_endgame()
+        assert not is_end
+        assert world.max_step == 3
+
+
+def test_world_initial_board():
+    chess_board, p0_pos, p1_pos = random_board(7, np.random.default_rng(0))
+    world = World(None, None, bitboard=True, initial_board=(chess_board, p0_pos, p1_pos))
+    assert world.p0 is None and world.p1 is None
+    assert world.board_size == 7 and world.max_step == 4
+    assert np.array_equal(world.p0_pos, p0_pos) and np.array_equal(world.p1_pos, p1_pos)
+    assert np.array_equal(np.asarray(world.chess_board), chess_board)
+    # the world plays on its own copy of the board
+    before = chess_board.copy()
+    world.set_barrier(3, 3, 0)
+    assert np.asarray(world.chess_board)[3, 3, 0]
+    assert np.array_equal(chess_board, before)
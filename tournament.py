@@ -0,0 +1,376 @@
+from simulator import Simulator
+from world import ENDGAME_BACKENDS
+from store import AGENT_REGISTRY
+import argparse
+import json
+import logging
+import os
+from math import log10
+from multiprocessing import Pool
+from tqdm import tqdm
+import numpy as np
+from utils import all_logging_disabled
+
+logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Round-robin tournament between registered agents"
+    )
+    parser.add_argument(
+        "--agents",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Registered agents taking part, all the agents that can autoplay if not set",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=10,
+        help="Number of boards per pairing, each played once with each color",
+    )
+    parser.add_argument("--board_size_min", type=int, default=6)
+    parser.add_argument("--board_size_max", type=int, default=12)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed of the tournament, all pairings play the same boards",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes playing games in parallel",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help="JSONL file where finished games are appended, an interrupted tournament resumes from it",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Write the crosstable and the Elo ratings to this JSON file",
+    )
+    parser.add_argument(
+        "--endgame_backend",
+        type=str,
+        default="incremental",
+        choices=ENDGAME_BACKENDS,
+    )
+    parser.add_argument("--bitboard", action="store_true", default=False)
+    parser.add_argument(
+        "--move_time_limit",
+        type=float,
+        default=None,
+        help="If set, the seconds an agent has for each move, a late move is replaced by a random walk",
+    )
+    parser.add_argument(
+        "--first_move_time_limit",
+        type=float,
+        default=None,
+        help="If set, the time limit of the first move of each agent instead of --move_time_limit",
+    )
+    parser.add_argument(
+        "--game_time_limit",
+        type=float,
+        default=None,
+        help="If set, the seconds each agent has for all its moves in a game",
+    )
+    args = parser.parse_args()
+    return args
+
+
+def autoplay_agents():
+    """
+    Names of the registered agents that can play without a human.
+    """
+    return [name for name, agent in AGENT_REGISTRY.items() if agent().autoplay]
+
+
+def tournament_games(agents, rounds, seed, board_size_min, board_size_max):
+    """
+    Every game of a round-robin tournament.
+
+    In each round, every pairing plays the same board twice, once with each
+    color. The board of a round depends only on the seed and the round.
+
+    Returns
+    -------
+    games : list of dict
+        key, round, board_size, player_1 and player_2 of every game.
+    """
+    games = []
+    for round in range(rounds):
+        board_size = int(
+            np.random.default_rng(np.random.SeedSequence([seed, round])).integers(
+                board_size_min, board_size_max
+            )
+        )
+        for i, agent_a in enumerate(agents):
+            for agent_b in agents[i + 1 :]:
+                for player_1, player_2 in ((agent_a, agent_b), (agent_b, agent_a)):
+                    games.append(
+                        {
+                            "key": f"{round}:{player_1}:{player_2}",
+                            "round": round,
+                            "board_size": board_size,
+                            "player_1": player_1,
+                            "player_2": player_2,
+                        }
+                    )
+    return games
+
+
+def play_game(job):
+    """
+    Play a tournament game, possibly in a worker process.
+
+    Parameters
+    ----------
+    job : tuple
+        (args, game) with the tournament's args and one of `tournament_games`
+
+    Returns
+    -------
+    result : dict
+        The game with the seed and board sizes of the tournament, the scores and the
+        time taken by each player.
+    """
+    args, game = job
+    simulator_args = argparse.Namespace(
+        player_1=game["player_1"],
+        player_2=game["player_2"],
+        board_size=game["board_size"],
+        display=False,
+        display_delay=0,
+        display_save=False,
+        display_save_path=None,
+        autoplay=True,
+        endgame_backend=args.endgame_backend,
+        bitboard=args.bitboard,
+        record_path=None,
+        stats_path=None,
+        seed=args.seed,
+        move_time_limit=args.move_time_limit,
+        first_move_time_limit=args.first_move_time_limit,
+        game_time_limit=args.game_time_limit,
+        remote=False,
+        remote_max_games=None,
+        remote_max_rss=None,
+    )
+    with all_logging_disabled():
+        p0_score, p1_score, p0_time, p1_time = Simulator(simulator_args).run(
+            board_size=game["board_size"],
+            seed=np.random.SeedSequence([args.seed, game["round"]]),
+        )
+    return dict(
+        game,
+        seed=args.seed,
+        board_size_min=args.board_size_min,
+        board_size_max=args.board_size_max,
+        p0_score=int(p0_score),
+        p1_score=int(p1_score),
+        p0_time=p0_time,
+        p1_time=p1_time,
+    )
+
+
+def read_checkpoint(path):
+    """
+    Finished games of a checkpoint file, an empty list if it does not exist.
+    """
+    if path is None or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def crosstable(agents, results):
+    """
+    Aggregate the results of the games by pairing.
+
+    Returns
+    -------
+    table : dict
+        table[a][b] is a dict with the games, wins, draws, losses and score
+        (wins plus half the draws, over the games) of agent a against agent b.
+    """
+    table = {
+        a: {b: {"games": 0, "wins": 0, "draws": 0, "losses": 0} for b in agents if b != a}
+        for a in agents
+    }
+    for result in results:
+        a, b = result["player_1"], result["player_2"]
+        if a not in table or b not in table:
+            continue
+        outcome = np.sign(result["p0_score"] - result["p1_score"])
+        for agent, opponent, sign in ((a, b, 1), (b, a, -1)):
+            cell = table[agent][opponent]
+            cell["games"] += 1
+            if outcome * sign > 0:
+                cell["wins"] += 1
+            elif outcome == 0:
+                cell["draws"] += 1
+            else:
+                cell["losses"] += 1
+    for a in table:
+        for cell in table[a].values():
+            cell["score"] = (
+                (cell["wins"] + cell["draws"] / 2) / cell["games"] if cell["games"] else None
+            )
+    return table
+
+
+def elo_ratings(table, iterations=1000, tolerance=1e-9):
+    """
+    Elo ratings fitted to the whole crosstable (Bradley-Terry model, draws as half
+    wins), so they don't depend on the order of the games. Each pairing counts one
+    extra draw, which keeps the ratings finite when an agent wins all its games.
+
+    Returns
+    -------
+    ratings : dict
+        Elo rating of every agent, with an average of 0.
+    """
+    agents = list(table)
+    gamma = {a: 1.0 for a in agents}
+    for _ in range(iterations):
+        new_gamma = {}
+        for a in agents:
+            score = 0.0
+            denominator = 0.0
+            for b, cell in table[a].items():
+                if not cell["games"]:
+                    continue
+                games = cell["games"] + 1
+                score += cell["wins"] + (cell["draws"] + 1) / 2
+                denominator += games / (gamma[a] + gamma[b])
+            new_gamma[a] = score / denominator if denominator else 1.0
+        # ratings are relative, fix their geometric mean
+        mean = np.exp(np.mean(np.log(list(new_gamma.values()))))
+        new_gamma = {a: g / mean for a, g in new_gamma.items()}
+        change = max(abs(new_gamma[a] - gamma[a]) for a in agents)
+        gamma = new_gamma
+        if change < tolerance:
+            break
+    return {a: 400 * log10(gamma[a]) for a in agents}
+
+
+def format_crosstable(table, ratings):
+    """
+    Text crosstable of the score of each agent (row) against each opponent (column).
+    """
+    agents = sorted(table, key=lambda a: -ratings[a])
+    width = max(8, max(len(a) for a in agents) + 2)
+    lines = ["".join(f"{name:>{width}}" for name in [""] + agents + ["total", "elo"])]
+    for a in agents:
+        row = [f"{a:>{width}}"]
+        wins = draws = games = 0
+        for b in agents:
+            if b == a or table[a][b]["score"] is None:
+                row.append(f"{'-':>{width}}")
+                continue
+            cell = table[a][b]
+            row.append(f"{cell['score']:>{width}.1%}")
+            wins += cell["wins"]
+            draws += cell["draws"]
+            games += cell["games"]
+        total = (wins + draws / 2) / games if games else 0.0
+        row.append(f"{total:>{width}.1%}")
+        row.append(f"{ratings[a]:>{width}.0f}")
+        lines.append("".join(row))
+    return "\n".join(lines)
+
+
+def run_tournament(args):
+    """
+    Play every game of the tournament that is not in the checkpoint yet.
+
+    Returns
+    -------
+    table : dict
+        The crosstable, see `crosstable`.
+    ratings : dict
+        The Elo rating of every agent.
+    """
+    agents = args.agents if args.agents else autoplay_agents()
+    if len(agents) < 2:
+        raise ValueError("A tournament needs at least two agents.")
+    for agent in agents:
+        if agent not in AGENT_REGISTRY:
+            raise ValueError(f"Agent '{agent}' is not registered.")
+    if len(set(agents)) < len(agents):
+        raise ValueError(f"An agent takes part in the tournament more than once: {agents}.")
+
+    finished = read_checkpoint(args.checkpoint)
+    if finished and args.seed is None:
+        args.seed = finished[0]["seed"]
+    if args.seed is None:
+        args.seed = int(np.random.SeedSequence().entropy)
+    if any(result["seed"] != args.seed for result in finished):
+        raise ValueError(
+            f"The checkpoint {args.checkpoint} was played with another seed than {args.seed}."
+        )
+    # the boards of the games depend on the board sizes too
+    board_sizes = (args.board_size_min, args.board_size_max)
+    if any(
+        (result.get("board_size_min"), result.get("board_size_max")) != board_sizes
+        for result in finished
+    ):
+        raise ValueError(
+            f"The checkpoint {args.checkpoint} was played with other board sizes than {board_sizes}."
+        )
+    logger.info(f"Tournament seed: {args.seed}")
+
+    done = {result["key"] for result in finished}
+    games = tournament_games(
+        agents, args.rounds, args.seed, args.board_size_min, args.board_size_max
+    )
+    jobs = [(args, game) for game in games if game["key"] not in done]
+    logger.info(
+        f"{len(agents)} agents, {len(games)} games, {len(games) - len(jobs)} already played"
+    )
+
+    results = [result for result in finished if result["key"] in {g["key"] for g in games}]
+    checkpoint = open(args.checkpoint, "a") if args.checkpoint is not None else None
+    with all_logging_disabled():
+        # Games are scheduled one at a time over the pool, so a long pairing
+        # does not hold back the others
+        if args.workers > 1:
+            pool = Pool(args.workers)
+            played = pool.imap_unordered(play_game, jobs)
+        else:
+            pool = None
+            played = map(play_game, jobs)
+        try:
+            for result in tqdm(played, total=len(jobs)):
+                results.append(result)
+                if checkpoint is not None:
+                    checkpoint.write(json.dumps(result) + "\n")
+                    checkpoint.flush()
+        finally:
+            if pool is not None:
+                pool.terminate()
+            if checkpoint is not None:
+                checkpoint.close()
+
+    table = crosstable(agents, results)
+    ratings = elo_ratings(table)
+    return table, ratings
+
+
+if __name__ == "__main__":
+    args = get_args()
+    table, ratings = run_tournament(args)
+    print(format_crosstable(table, ratings))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"seed": args.seed, "crosstable": table, "elo": ratings}, f, indent=2)
@@ -1,5 +1,7 @@
 from contextlib import contextmanager
 import logging
+import numpy as np
+from bitboard import BitBoard
 
 
 @contextmanager
@@ -24,3 +26,27 @@ def all_logging_disabled(highest_level=logging.CRITICAL):
         yield
     finally:
         logging.disable(previous_level)
+
+
+def readonly_board(chess_board):
+    """
+    Get a read-only view of a chess board without copying it.
+    Writing to a view of a numpy chess board raises a ValueError, as does
+    putting a barrier on a view of a BitBoard.
+    :param chess_board: the numpy array or BitBoard to view.
+    """
+    if isinstance(chess_board, BitBoard):
+        return chess_board.readonly_view()
+    view = chess_board.view()
+    view.flags.writeable = False
+    return view
+
+
+def as_seed_sequence(seed=None):
+    """
+    Turn a seed into a numpy SeedSequence, from which independent seeds can be spawned.
+    :param seed: None for a random seed, an int, a sequence of ints or a SeedSequence.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
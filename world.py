@@ -3,18 +3,36 @@ from copy import deepcopy
 import traceback
 from agents import *
 from ui import UIEngine
-from time import sleep, time
+from time import sleep, time, perf_counter
 import click
 import logging
 from store import AGENT_REGISTRY
 from constants import *
+from utils import readonly_board, as_seed_sequence
+from connectivity import RegionTracker, region_scores
+from bitboard import BitBoard
+from boardgen import random_board
+from movegen import is_reachable
+from record import GameRecord
 import sys
+import threading
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
 
 logger = logging.getLogger(__name__)
 
 
+class AgentTimeout(Exception):
+    """
+    Raised when an agent does not return its step within its time limit.
+    """
+
+
 class World:
     def __init__(
         self,
@@ -26,16 +44,26 @@ class World:
         display_save=False,
         display_save_path=None,
         autoplay=False,
+        endgame_backend="incremental",
+        bitboard=False,
+        seed=None,
+        move_time_limit=None,
+        first_move_time_limit=None,
+        game_time_limit=None,
+        initial_board=None,
     ):
         """
         Initialize the game world
 
         Parameters
         ----------
-        player_1: str
-            The registered class of the first player
-        player_2: str
-            The registered class of the second player
+        player_1: str or Agent or None
+            The registered class of the first player, or an agent instance such as a RemoteAgent.
+            The world calls set_seed on the agent at the start of the game, agents kept across
+            games must reset their state of the previous game there. None for a world without
+            agents, such as a replay.
+        player_2: str or Agent or None
+            The registered class of the second player, or an agent instance
         board_size: int
             The size of the board. If None, board_size = a number between MIN_BOARD_SIZE and MAX_BOARD_SIZE
         display_ui : bool
@@ -48,27 +76,55 @@ class World:
             The path to save the image
         autoplay : bool
             Whether the game is played in autoplay mode
+        endgame_backend : str
+            How check_endgame finds the connected regions, one of ENDGAME_BACKENDS.
+            "incremental" updates the regions on every barrier, "vectorized" labels
+            the whole board with array operations, which scales better on large boards.
+        bitboard : bool
+            Whether to store the chess board as a BitBoard instead of a numpy array
+        seed : int or numpy.random.SeedSequence
+            Seed of the game. The world and both agents draw from their own random
+            generators spawned from it. If None, the game is not reproducible.
+        move_time_limit : float
+            If not None, the seconds an agent has to return each step. Agents then step
+            in a watchdog thread, and a late step is replaced by a Random Walk.
+        first_move_time_limit : float
+            If not None, the limit of the first step of each agent instead of move_time_limit
+        game_time_limit : float
+            If not None, the seconds each agent has for all its steps in the game
+        initial_board : tuple of (chess_board, p0_pos, p1_pos)
+            If not None, the game starts from a copy of this board and these positions
+            instead of a random board, and board_size is the size of this board
         """
         # Two players
         logger.info("Initialize the game world")
         # Load agents as defined in decorators
-        self.player_1_name = player_1
-        self.player_2_name = player_2
-        if player_1 not in AGENT_REGISTRY:
-            raise ValueError(
-                f"Agent '{player_1}' is not registered. {AGENT_NOT_FOUND_MSG}"
-            )
-        if player_2 not in AGENT_REGISTRY:
+        for player in (player_1, player_2):
+            if isinstance(player, str) and player not in AGENT_REGISTRY:
+                raise ValueError(
+                    f"Agent '{player}' is not registered. {AGENT_NOT_FOUND_MSG}"
+                )
+
+        if endgame_backend not in ENDGAME_BACKENDS:
             raise ValueError(
-                f"Agent '{player_2}' is not registered. {AGENT_NOT_FOUND_MSG}"
+                f"Unknown endgame backend '{endgame_backend}'. Choose one of {ENDGAME_BACKENDS}."
             )
+        self.endgame_backend = endgame_backend
 
-        p0_agent = AGENT_REGISTRY[player_1]
-        p1_agent = AGENT_REGISTRY[player_2]
         logger.info(f"Registering p0 agent : {player_1}")
-        self.p0 = p0_agent()
+        self.p0 = AGENT_REGISTRY[player_1]() if isinstance(player_1, str) else player_1
         logger.info(f"Registering p1 agent : {player_2}")
-        self.p1 = p1_agent()
+        self.p1 = AGENT_REGISTRY[player_2]() if isinstance(player_2, str) else player_2
+        self.player_1_name = player_1 if isinstance(player_1, (str, type(None))) else str(player_1)
+        self.player_2_name = player_2 if isinstance(player_2, (str, type(None))) else str(player_2)
+
+        # Independent random generators for the world and both agents
+        self.seed = as_seed_sequence(seed)
+        world_seed, p0_seed, p1_seed = self.seed.spawn(3)
+        self.rng = np.random.default_rng(world_seed)
+        for agent, agent_seed in ((self.p0, p0_seed), (self.p1, p1_seed)):
+            if agent is not None:
+                agent.set_seed(agent_seed)
 
         # check autoplay
         if autoplay:
@@ -91,9 +147,15 @@ class World:
         # Opposite Directions
         self.opposites = {0: 2, 1: 3, 2: 0, 3: 1}
 
-        if board_size is None:
+        if initial_board is not None:
+            chess_board, p0_pos, p1_pos = initial_board
+            chess_board = np.array(chess_board, dtype=bool)
+            self.p0_pos, self.p1_pos = np.asarray(p0_pos), np.asarray(p1_pos)
+            self.board_size = chess_board.shape[0]
+            logger.info(f"Starting from a given {self.board_size}x{self.board_size} board")
+        elif board_size is None:
             # Random chessboard size
-            self.board_size = np.random.randint(MIN_BOARD_SIZE, MAX_BOARD_SIZE)
+            self.board_size = int(self.rng.integers(MIN_BOARD_SIZE, MAX_BOARD_SIZE))
             logger.info(
                 f"No board size specified. Randomly generating size : {self.board_size}x{self.board_size}"
             )
@@ -102,48 +164,40 @@ class World:
             logger.info(f"Setting board size to {self.board_size}x{self.board_size}")
 
         # Index in dim2 represents [Up, Right, Down, Left] respectively
-        # Record barriers and boarders for each block
-        self.chess_board = np.zeros((self.board_size, self.board_size, 4), dtype=bool)
-
-        # Set borders
-        self.chess_board[0, :, 0] = True
-        self.chess_board[:, 0, 3] = True
-        self.chess_board[-1, :, 2] = True
-        self.chess_board[:, -1, 1] = True
+        if initial_board is None:
+            # Random barriers (symmetric) and start positions, drawn so that the
+            # players are not separated from the start
+            chess_board, self.p0_pos, self.p1_pos = random_board(self.board_size, self.rng)
+        self.chess_board = BitBoard.from_array(chess_board) if bitboard else chess_board
 
         # Maximum Steps
         self.max_step = (self.board_size + 1) // 2
 
-        # Random barriers (symmetric)
-        for _ in range(self.max_step):
-            pos = np.random.randint(0, self.board_size, size=2)
-            r, c = pos
-            dir = np.random.randint(0, 4)
-            while self.chess_board[r, c, dir]:
-                pos = np.random.randint(0, self.board_size, size=2)
-                r, c = pos
-                dir = np.random.randint(0, 4)
-            anti_pos = self.board_size - 1 - pos
-            anti_dir = self.opposites[dir]
-            anti_r, anti_c = anti_pos
-            self.set_barrier(r, c, dir)
-            self.set_barrier(anti_r, anti_c, anti_dir)
-
-        # Random start position (symmetric but not overlap)
-        self.p0_pos = np.random.randint(0, self.board_size, size=2)
-        self.p1_pos = self.board_size - 1 - self.p0_pos
-        while np.array_equal(self.p0_pos, self.p1_pos):
-            self.p0_pos = np.random.randint(0, self.board_size, size=2)
-            self.p1_pos = self.board_size - 1 - self.p0_pos
+        # Connected regions of the board, built lazily by check_endgame
+        self.region_tracker = None
+
         # Whose turn to step
         self.turn = 0
 
-        # Check initialization
-        self.initial_end, _, _ = self.check_endgame()
+        # Record of the game, from the initial board
+        self.game_record = GameRecord(
+            self.chess_board,
+            self.p0_pos,
+            self.p1_pos,
+            seed=self.seed,
+            players=(self.player_1_name, self.player_2_name),
+        )
 
         # Time taken by each player
         self.p0_time = 0
         self.p1_time = 0
+        self.move_time_limit = move_time_limit
+        self.first_move_time_limit = first_move_time_limit
+        self.game_time_limit = game_time_limit
+        # Watchdog thread of the last step of each player, see run_agent_step
+        self.agent_threads = {0: None, 1: None}
+        # Timings and agent metrics of every move, see step
+        self.move_stats = []
 
         # Cache to store and use the data
         self.results_cache = ()
@@ -187,11 +241,157 @@ class World:
         else:
             self.p1_time += time_taken
 
+    def get_time_limit(self):
+        """
+        Get the time the current player has for its step, None if it is not limited.
+        """
+        limits = []
+        move_limit = self.move_time_limit
+        if len(self.move_stats) < 2 and self.first_move_time_limit is not None:
+            move_limit = self.first_move_time_limit
+        if move_limit is not None:
+            limits.append(move_limit)
+        if self.game_time_limit is not None:
+            limits.append(
+                self.game_time_limit - (self.p1_time if self.turn else self.p0_time)
+            )
+        return min(limits) if limits else None
+
+    def run_agent_step(self, agent, chess_board, my_pos, adv_pos, time_limit):
+        """
+        Run the step function of an agent, under a watchdog thread if its time is limited.
+        A thread cannot be stopped, so an agent that missed its deadline keeps running in
+        the background, and its next steps time out until it returns.
+
+        Parameters
+        ----------
+        agent : Agent
+            The agent to step
+        chess_board, my_pos, adv_pos
+            The arguments of the step
+        time_limit : float
+            The seconds the agent has to return, None if it is not limited
+
+        Returns
+        -------
+        tuple of (next_pos, dir)
+
+        Raises
+        ------
+        AgentTimeout
+            If the agent did not return in time, or is still running its previous step
+        """
+        if time_limit is None:
+            return agent.step(chess_board, my_pos, adv_pos, self.max_step)
+        if time_limit <= 0:
+            raise AgentTimeout("No time left in the game")
+        previous = self.agent_threads[self.turn]
+        if previous is not None and previous.is_alive():
+            raise AgentTimeout("The previous step is still running")
+        result = {}
+
+        def run():
+            try:
+                result["move"] = agent.step(chess_board, my_pos, adv_pos, self.max_step)
+            except BaseException as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=run, daemon=True)
+        self.agent_threads[self.turn] = thread
+        thread.start()
+        thread.join(time_limit)
+        if thread.is_alive():
+            raise AgentTimeout(f"No step within {time_limit:.3f} seconds")
+        if "error" in result:
+            raise result["error"]
+        return result["move"]
+
+    def get_agent_metrics(self, agent):
+        """
+        Get the metrics reported by an agent about its last step, prefixed with "agent_".
+        Agents report metrics by implementing get_metrics, errors in it are only logged.
+
+        Parameters
+        ----------
+        agent : Agent
+            The agent that just stepped
+        """
+        get_metrics = getattr(agent, "get_metrics", None)
+        if get_metrics is None:
+            return {}
+        try:
+            metrics = get_metrics() or {}
+        except Exception:
+            logger.warning(
+                f"get_metrics of {agent} failed:\n{traceback.format_exc()}"
+            )
+            return {}
+        return {f"agent_{key}": value for key, value in metrics.items()}
+
+    def game_stats(self):
+        """
+        Summary of the timings of the game so far, from the stats of every move.
+
+        Returns
+        -------
+        stats : dict
+            The players, board size, number of moves, scores if the game ended, the time
+            taken and random walks of each player, and the total time spent by the world
+            copying boards, validating moves, putting barriers and checking the endgame.
+        """
+        stats = {
+            "player_1": self.player_1_name,
+            "player_2": self.player_2_name,
+            "board_size": self.board_size,
+            "moves": len(self.move_stats),
+            "p0_score": None,
+            "p1_score": None,
+            "p0_time": self.p0_time,
+            "p1_time": self.p1_time,
+            "p0_random_walks": 0,
+            "p1_random_walks": 0,
+            "p0_timeouts": 0,
+            "p1_timeouts": 0,
+        }
+        if self.game_record.scores is not None:
+            stats["p0_score"], stats["p1_score"] = self.game_record.scores
+        for key in ("copy_time", "validation_time", "barrier_time", "endgame_time"):
+            stats[key] = sum(move[key] for move in self.move_stats)
+        for move in self.move_stats:
+            if move["random_walk"]:
+                stats[f"p{move['player']}_random_walks"] += 1
+            if move["timeout"]:
+                stats[f"p{move['player']}_timeouts"] += 1
+        return stats
+
+    def get_agent_board(self, agent, snapshot=False):
+        """
+        Get the chess board passed to the step function of an agent.
+        Agents that set mutable_board = False get a read-only view of the chess board,
+        the others get their own copy.
+
+        Parameters
+        ----------
+        agent : Agent
+            The agent about to step
+        snapshot : bool
+            Whether a read-only board must not follow the barriers put after the step.
+            A step that times out keeps running while the game goes on, so it needs a
+            read-only copy instead of a live view. The read-only view of a BitBoard is
+            already a copy.
+        """
+        if getattr(agent, "mutable_board", True):
+            return deepcopy(self.chess_board)
+        if snapshot and not isinstance(self.chess_board, BitBoard):
+            return readonly_board(self.chess_board.copy())
+        return readonly_board(self.chess_board)
+
     def step(self):
         """
         Take a step in the game world.
         Runs the agents' step function and update the game board accordingly.
-        If the agents' step function raises an exception, the step will be replaced by a Random Walk.
+        If the agents' step function raises an exception, or does not return within the time
+        limits of the world, the step will be replaced by a Random Walk.
 
         Returns
         -------
@@ -199,18 +399,29 @@ class World:
             The results of the step containing (is_endgame, player_1_score, player_2_score)
         """
         cur_player, cur_pos, adv_pos = self.get_current_player()
+        random_walk = False
+        timeout = False
+        time_limit = self.get_time_limit()
+
+        copy_start = perf_counter()
+        agent_board = self.get_agent_board(cur_player, snapshot=time_limit is not None)
+        copy_time = perf_counter() - copy_start
 
+        start_time = time()
+        validation_time = 0.0
         try:
             # Run the agents step function
-            start_time = time()
-            next_pos, dir = cur_player.step(
-                deepcopy(self.chess_board),
+            next_pos, dir = self.run_agent_step(
+                cur_player,
+                agent_board,
                 tuple(cur_pos),
                 tuple(adv_pos),
-                self.max_step,
+                time_limit,
             )
-            self.update_player_time(time() - start_time)
+            think_time = time() - start_time
+            self.update_player_time(think_time)
 
+            validation_start = perf_counter()
             next_pos = np.asarray(next_pos, dtype=cur_pos.dtype)
             if not self.check_boundary(next_pos):
                 raise ValueError("End position {} is out of boundary".format(next_pos))
@@ -226,20 +437,43 @@ class World:
                         cur_pos, next_pos, dir, self.max_step
                     )
                 )
+            validation_time = perf_counter() - validation_start
         except BaseException as e:
             ex_type = type(e).__name__
             if (
                 "SystemExit" in ex_type and isinstance(cur_player, HumanAgent)
             ) or "KeyboardInterrupt" in ex_type:
                 sys.exit(0)
-            print(
-                "An exception raised. The traceback is as follows:\n{}".format(
-                    traceback.format_exc()
+            think_time = time() - start_time
+            if isinstance(e, AgentTimeout):
+                logger.warning(
+                    f"Player {self.player_names[self.turn]} timed out: {e}. Execute Random Walk!"
                 )
-            )
-            print("Execute Random Walk!")
+                # The time of a late step counts towards the time limit of the game
+                self.update_player_time(think_time)
+                timeout = True
+            else:
+                print(
+                    "An exception raised. The traceback is as follows:\n{}".format(
+                        traceback.format_exc()
+                    )
+                )
+                print("Execute Random Walk!")
             next_pos, dir = self.random_walk(tuple(cur_pos), tuple(adv_pos))
             next_pos = np.asarray(next_pos, dtype=cur_pos.dtype)
+            random_walk = True
+
+        self.game_record.add_move(next_pos, dir, think_time)
+        stats = {
+            "move": len(self.move_stats),
+            "player": self.turn,
+            "agent": self.player_2_name if self.turn else self.player_1_name,
+            "think_time": think_time,
+            "copy_time": copy_time,
+            "validation_time": validation_time,
+            "random_walk": random_walk,
+            "timeout": timeout,
+        }
 
         # Print out each step
         # print(self.turn, next_pos, dir)
@@ -252,13 +486,27 @@ class World:
             self.p1_pos = next_pos
         # Set the barrier to True
         r, c = next_pos
+        barrier_start = perf_counter()
         self.set_barrier(r, c, dir)
+        stats["barrier_time"] = perf_counter() - barrier_start
 
         # Change turn
         self.turn = 1 - self.turn
 
+        endgame_start = perf_counter()
         results = self.check_endgame()
+        stats["endgame_time"] = perf_counter() - endgame_start
         self.results_cache = results
+        if results[0]:
+            self.game_record.scores = (results[1], results[2])
+
+        if resource is not None:
+            # peak memory of the process, in kilobytes on Linux
+            stats["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if not timeout:
+            # a late step is still running and may be rewriting its metrics
+            stats.update(self.get_agent_metrics(cur_player))
+        self.move_stats.append(stats)
 
         # Print out Chessboard for visualization
         if self.display_ui:
@@ -289,36 +537,14 @@ class World:
         r, c = end_pos
         if self.chess_board[r, c, barrier_dir]:
             return False
-        if np.array_equal(start_pos, end_pos):
-            return True
 
         # Get position of the adversary
         adv_pos = self.p0_pos if self.turn else self.p1_pos
 
-        # BFS
-        state_queue = [(start_pos, 0)]
-        visited = {tuple(start_pos)}
-        is_reached = False
-        while state_queue and not is_reached:
-            cur_pos, cur_step = state_queue.pop(0)
-            r, c = cur_pos
-            if cur_step == self.max_step:
-                break
-            for dir, move in enumerate(self.moves):
-                if self.chess_board[r, c, dir]:
-                    continue
-
-                next_pos = cur_pos + move
-                if np.array_equal(next_pos, adv_pos) or tuple(next_pos) in visited:
-                    continue
-                if np.array_equal(next_pos, end_pos):
-                    is_reached = True
-                    break
-
-                visited.add(tuple(next_pos))
-                state_queue.append((next_pos, cur_step + 1))
-
-        return is_reached
+        # Bounded BFS, stopping as soon as the end position is reached
+        return is_reachable(
+            self.chess_board, start_pos, end_pos, adv_pos, self.max_step
+        )
 
     def check_endgame(self):
         """
@@ -333,40 +559,22 @@ class World:
         player_2_score : int
             The score of player 2.
         """
-        # Union-Find
-        father = dict()
-        for r in range(self.board_size):
-            for c in range(self.board_size):
-                father[(r, c)] = (r, c)
-
-        def find(pos):
-            if father[pos] != pos:
-                father[pos] = find(father[pos])
-            return father[pos]
-
-        def union(pos1, pos2):
-            father[pos1] = pos2
-
-        for r in range(self.board_size):
-            for c in range(self.board_size):
-                for dir, move in enumerate(
-                    self.moves[1:3]
-                ):  # Only check down and right
-                    if self.chess_board[r, c, dir + 1]:
-                        continue
-                    pos_a = find((r, c))
-                    pos_b = find((r + move[0], c + move[1]))
-                    if pos_a != pos_b:
-                        union(pos_a, pos_b)
-
-        for r in range(self.board_size):
-            for c in range(self.board_size):
-                find((r, c))
-        p0_r = find(tuple(self.p0_pos))
-        p1_r = find(tuple(self.p1_pos))
-        p0_score = list(father.values()).count(p0_r)
-        p1_score = list(father.values()).count(p1_r)
-        if p0_r == p1_r:
+        if self.endgame_backend == "vectorized" and isinstance(
+            self.chess_board, BitBoard
+        ):
+            connected, p0_score, p1_score = self.chess_board.region_scores(
+                self.p0_pos, self.p1_pos
+            )
+        elif self.endgame_backend == "vectorized":
+            connected, p0_score, p1_score = region_scores(
+                self.chess_board, self.p0_pos, self.p1_pos
+            )
+        else:
+            regions = self.get_region_tracker()
+            connected = regions.connected(self.p0_pos, self.p1_pos)
+            p0_score = regions.region_size(self.p0_pos)
+            p1_score = regions.region_size(self.p1_pos)
+        if connected:
             return False, p0_score, p1_score
         player_win = None
         win_blocks = -1
@@ -390,12 +598,30 @@ class World:
         r, c = pos
         return 0 <= r < self.board_size and 0 <= c < self.board_size
 
+    def get_region_tracker(self):
+        """
+        Get the tracker of the connected regions of the current chess board.
+        The tracker is rebuilt if the chess board has been replaced since it was built.
+        """
+        if (
+            self.region_tracker is None
+            or self.region_tracker.chess_board is not self.chess_board
+        ):
+            self.region_tracker = RegionTracker(self.chess_board)
+        return self.region_tracker
+
     def set_barrier(self, r, c, dir):
         # Set the barrier to True
         self.chess_board[r, c, dir] = True
         # Set the opposite barrier to True
         move = self.moves[dir]
         self.chess_board[r + move[0], c + move[1], self.opposites[dir]] = True
+        # Keep the connected regions up to date
+        if (
+            self.region_tracker is not None
+            and self.region_tracker.chess_board is self.chess_board
+        ):
+            self.region_tracker.add_barrier(r, c, dir)
 
     def random_walk(self, my_pos, adv_pos):
         """
@@ -409,11 +635,11 @@ class World:
             The position of the adversary.
         """
         ori_pos = deepcopy(my_pos)
-        steps = np.random.randint(0, self.max_step + 1)
+        steps = self.rng.integers(0, self.max_step + 1)
         # Random Walk
         for _ in range(steps):
             r, c = my_pos
-            dir = np.random.randint(0, 4)
+            dir = int(self.rng.integers(0, 4))
             m_r, m_c = self.moves[dir]
             my_pos = (r + m_r, c + m_c)
 
@@ -423,7 +649,7 @@ class World:
                 k += 1
                 if k > 300:
                     break
-                dir = np.random.randint(0, 4)
+                dir = int(self.rng.integers(0, 4))
                 m_r, m_c = self.moves[dir]
                 my_pos = (r + m_r, c + m_c)
 
@@ -432,10 +658,10 @@ class World:
                 break
 
         # Put Barrier
-        dir = np.random.randint(0, 4)
+        dir = int(self.rng.integers(0, 4))
         r, c = my_pos
         while self.chess_board[r, c, dir]:
-            dir = np.random.randint(0, 4)
+            dir = int(self.rng.integers(0, 4))
 
         return my_pos, dir
 